@@ -0,0 +1,52 @@
+import bisect
+import hashlib
+
+
+class ConsistentHashRing:
+	'''
+		Nodes placed on a ring of 64 bit hashes, each at vnode_count points
+		(virtual nodes) so keys spread evenly and a new node takes a little
+		from every other node. A key belongs to the first point at or after
+		its hash, found by binary search.
+
+		Hashes are blake2b of the key's bytes, the same in every process.
+	'''
+	VNODE_COUNT = 160
+
+	def __init__(self, nodes=(), vnode_count=VNODE_COUNT) -> None:
+		self.vnode_count = vnode_count
+		self.points = []		# sorted hashes
+		self.owners = []		# node of each point
+		self.nodes = set()
+		for node in nodes:
+			self.add_node(node)
+
+	@staticmethod
+	def hash(data):
+		if isinstance(data, str):
+			data = data.encode('utf-8', 'surrogateescape')
+		return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'big')
+
+	def _vnode_points(self, node):
+		return [self.hash(f'{node}#{index}') for index in range(self.vnode_count)]
+
+	def add_node(self, node):
+		if node in self.nodes:
+			raise ValueError(f"{node} is already in the ring")
+		self.nodes.add(node)
+		for point in self._vnode_points(node):
+			index = bisect.bisect_left(self.points, point)
+			self.points.insert(index, point)
+			self.owners.insert(index, node)
+
+	def remove_node(self, node):
+		self.nodes.remove(node)
+		keep = [(point, owner) for point, owner in zip(self.points, self.owners) if owner != node]
+		self.points = [point for point, _ in keep]
+		self.owners = [owner for _, owner in keep]
+
+	def node_for(self, key):
+		if not self.points:
+			raise LookupError("the ring has no nodes")
+		index = bisect.bisect_left(self.points, self.hash(key))
+		return self.owners[index % len(self.points)]
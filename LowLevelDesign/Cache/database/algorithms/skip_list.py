@@ -0,0 +1,119 @@
+import random
+
+
+class SkipListNode:
+	__slots__ = ('key', 'forward', 'backward')
+
+	def __init__(self, key, level) -> None:
+		self.key = key
+		self.forward = [None] * level
+		self.backward = None		# previous node on the bottom level
+
+
+class SkipList:
+	'''
+		Sorted set of keys. Every node is on the bottom level, each level up
+		holds a random P fraction of the level below, so a search skips ahead
+		on the top levels and finds a key in O(log n) expected steps.
+		The bottom level is also linked backwards for reverse scans.
+	'''
+	MAX_LEVEL = 32
+	P = 0.25
+
+	def __init__(self, seed=None) -> None:
+		self.head = SkipListNode(None, self.MAX_LEVEL)
+		self.level = 1
+		self.length = 0
+		self.random = random.Random(seed)
+
+	def __len__(self):
+		return self.length
+
+	def _random_level(self):
+		level = 1
+		while level < self.MAX_LEVEL and self.random.random() < self.P:
+			level += 1
+		return level
+
+	def _predecessors(self, key):
+		'''
+			last node before key on every level
+		'''
+		update = [self.head] * self.MAX_LEVEL
+		node = self.head
+		for level in range(self.level - 1, -1, -1):
+			following = node.forward[level]
+			while following is not None and following.key < key:
+				node = following
+				following = node.forward[level]
+			update[level] = node
+		return update
+
+	def insert(self, key):
+		'''
+			add key, return False if it was already there
+		'''
+		update = self._predecessors(key)
+		following = update[0].forward[0]
+		if following is not None and following.key == key:
+			return False
+		level = self._random_level()
+		if level > self.level:
+			self.level = level
+		node = SkipListNode(key, level)
+		for index in range(level):
+			node.forward[index] = update[index].forward[index]
+			update[index].forward[index] = node
+		node.backward = None if update[0] is self.head else update[0]
+		if node.forward[0] is not None:
+			node.forward[0].backward = node
+		self.length += 1
+		return True
+
+	def remove(self, key):
+		'''
+			remove key, return False if it wasn't there
+		'''
+		update = self._predecessors(key)
+		node = update[0].forward[0]
+		if node is None or node.key != key:
+			return False
+		for index in range(len(node.forward)):
+			update[index].forward[index] = node.forward[index]
+		if node.forward[0] is not None:
+			node.forward[0].backward = node.backward
+		while self.level > 1 and self.head.forward[self.level - 1] is None:
+			self.level -= 1
+		self.length -= 1
+		return True
+
+	def _first_at_least(self, key):
+		if key is None:
+			return self.head.forward[0]
+		return self._predecessors(key)[0].forward[0]
+
+	def _last_below(self, key):
+		if key is None:
+			node = self.head
+			for level in range(self.level - 1, -1, -1):
+				while node.forward[level] is not None:
+					node = node.forward[level]
+			return None if node is self.head else node
+		node = self._predecessors(key)[0]
+		return None if node is self.head else node
+
+	def iterate(self, start=None, end=None, reverse=False):
+		'''
+			keys in [start, end) ascending, or descending with reverse
+			None leaves that side unbounded
+		'''
+		if reverse:
+			node = self._last_below(end)
+			while node is not None and (start is None or node.key >= start):
+				yield node.key
+				node = node.backward
+		else:
+			node = self._first_at_least(start)
+			while node is not None and (end is None or node.key < end):
+				yield node.key
+				node = node.forward[0]
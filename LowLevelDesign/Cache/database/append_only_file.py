@@ -0,0 +1,341 @@
+import os
+import struct
+import threading
+import zlib
+from contextlib import contextmanager
+
+from database.codec import decode, encode
+from database.database_listener import DatabaseListener
+from database.exceptions.corrupted_append_only_file_exception import CorruptedAppendOnlyFileException
+
+
+class AppendOnlyFile(DatabaseListener):
+	'''
+		Log of every put and delete, replayed on startup to rebuild the database.
+
+		record: op (1 byte) | key length (4) | value length (4) | crc32 (4) | header crc32 (4) | key | value
+		crc32 covers key and value, header crc32 the 13 bytes before it, so a
+		damaged length is caught before it is trusted.
+		the records appended inside batch() are logged as one BATCH record
+		whose key is those records, so replay applies all of them or none.
+
+		fsync_policy decides when the log reaches the disk:
+			always   - put/delete return only after their record is fsynced.
+			           Writers arriving while an fsync runs queue up and the
+			           next fsync covers all of them (group commit). Inside
+			           deferred_sync() they return at once and the caller
+			           waits for all of them with one sync().
+			everysec - records are buffered and a background thread writes
+			           and fsyncs them every second, a crash loses up to 1s.
+			no       - the background thread writes every second and the OS
+			           decides when to sync.
+
+		rewrite(items) compacts the log in the background: a new log holding one
+		put per live key is written from a copy of the data while new records
+		also go to a rewrite buffer, then the buffer is appended and the new log
+		replaces the old one.
+	'''
+	ALWAYS = 'always'
+	EVERYSEC = 'everysec'
+	NO = 'no'
+	PUT = 1
+	DELETE = 2
+	BATCH = 3
+	HEADER = struct.Struct('<BIII')
+	RECORD = struct.Struct('<BIIII')		# header and its crc32
+	READ_CHUNK = 1 << 20
+
+	def __init__(self, path, fsync_policy=EVERYSEC) -> None:
+		if fsync_policy not in (self.ALWAYS, self.EVERYSEC, self.NO):
+			raise ValueError(f"unknown fsync policy {fsync_policy}")
+		self.path = path
+		self.fsync_policy = fsync_policy
+		self.file = open(path, 'ab')
+		self.lock = threading.Lock()
+		self.synced = threading.Condition(self.lock)
+		self.buffer = bytearray()
+		self.appended = 0		# sequence number of the last buffered record
+		self.written = 0		# sequence number of the last record written (and synced if always)
+		self.writing = False
+		self.rewrite_buffer = None
+		self.rewrite_thread = None
+		self.closed = False
+		self.local = threading.local()		# deferring and batch of the calling thread
+		self.flusher = None
+		if fsync_policy != self.ALWAYS:
+			self.flusher = threading.Thread(target=self._flush_every_second, daemon=True)
+			self.flusher.start()
+
+	@classmethod
+	def encode_record(cls, op, key, value=None):
+		key_data = encode(key)
+		value_data = encode(value) if op == cls.PUT else b''
+		payload = key_data + value_data
+		return cls._encode_header(op, len(key_data), len(value_data), zlib.crc32(payload)) + payload
+
+	@classmethod
+	def encode_batch(cls, records):
+		return cls._encode_header(cls.BATCH, len(records), 0, zlib.crc32(records)) + records
+
+	@classmethod
+	def _encode_header(cls, op, key_length, value_length, crc):
+		header = cls.HEADER.pack(op, key_length, value_length, crc)
+		return header + struct.pack('<I', zlib.crc32(header))
+
+	@classmethod
+	def _record_end(cls, data, position):
+		'''
+			end of the record at position, None if its header is damaged
+		'''
+		op, key_length, value_length, _, header_crc = cls.RECORD.unpack_from(data, position)
+		if zlib.crc32(data[position:position + cls.HEADER.size]) != header_crc \
+			or op not in (cls.PUT, cls.DELETE, cls.BATCH):
+			return None
+		return position + cls.RECORD.size + key_length + value_length
+
+	@classmethod
+	def decode_records(cls, data):
+		'''
+			decode the complete records at the start of data
+			return list of (op, key, value), bytes used by them, and whether
+			decoding stopped at a corrupted record rather than at the end
+		'''
+		records = []
+		view = memoryview(data)
+		position = 0
+		while position + cls.RECORD.size <= len(data):
+			end = cls._record_end(view, position)
+			if end is None:
+				return records, position, True
+			if end > len(data):
+				break
+			op, key_length, _, crc, _ = cls.RECORD.unpack_from(data, position)
+			payload = view[position + cls.RECORD.size:end]
+			if zlib.crc32(payload) != crc:
+				return records, position, True
+			if op == cls.BATCH:
+				batch, used, corrupted = cls.decode_records(payload)
+				if corrupted or used != len(payload):
+					return records, position, True
+				records.extend(batch)
+				position = end
+				continue
+			key = decode(bytes(payload[:key_length]))
+			value = decode(bytes(payload[key_length:])) if op == cls.PUT else None
+			records.append((op, key, value))
+			position = end
+		return records, position, False
+
+	def replay_into(self, storage):
+		'''
+			apply the log to storage dict, return number of records replayed
+			the file is read in large chunks, a torn record at the end
+			(crash during a write) is cut off, a corrupted record followed
+			by more data raises CorruptedAppendOnlyFileException
+			a record is only waited for across chunks once its header checks
+			out, so an incomplete one at the end of the file really is torn
+		'''
+		replayed = 0
+		valid_end = 0
+		pending = b''
+		file_size = os.path.getsize(self.path)
+		with open(self.path, 'rb') as log:
+			while True:
+				chunk = log.read(self.READ_CHUNK)
+				if not chunk:
+					break
+				data = pending + chunk if pending else chunk
+				records, position, corrupted = self.decode_records(data)
+				for op, key, value in records:
+					if op == self.PUT:
+						storage[key] = value
+					else:
+						storage.pop(key, None)
+				replayed += len(records)
+				valid_end += position
+				if corrupted:
+					end = self._record_end(data, position)
+					# a damaged header can't tell where its record ends
+					record_size = self.RECORD.size if end is None else end - position
+					if valid_end + record_size < file_size:
+						raise CorruptedAppendOnlyFileException(
+							f"{self.path}: corrupted record at byte {valid_end} is not the last one")
+					return self._truncate(valid_end, replayed)
+				pending = data[position:]
+		if pending:
+			return self._truncate(valid_end, replayed)
+		return replayed
+
+	def _truncate(self, valid_end, replayed):
+		with self.lock:
+			self.file.flush()
+			self.file.truncate(valid_end)
+		return replayed
+
+	def append(self, op, key, value=None):
+		record = self.encode_record(op, key, value)
+		batch = getattr(self.local, 'batch', None)
+		if batch is not None:
+			batch += record
+			return
+		self._append(record)
+
+	def _append(self, record):
+		with self.lock:
+			if self.closed:
+				raise RuntimeError("append only file is closed")
+			self.buffer += record
+			if self.rewrite_buffer is not None:
+				self.rewrite_buffer += record
+			self.appended += 1
+			if self.fsync_policy != self.ALWAYS or getattr(self.local, 'deferring', False):
+				return
+			self._wait_synced_locked(self.appended)
+
+	@contextmanager
+	def deferred_sync(self):
+		'''
+			with the always policy, appends made by this thread inside the block
+			don't wait for their fsync, call sync() before acknowledging them
+		'''
+		self.local.deferring = True
+		try:
+			yield
+		finally:
+			self.local.deferring = False
+
+	@contextmanager
+	def batch(self):
+		'''
+			records appended by this thread inside the block are logged
+			together when it ends, as one record a crash can't split
+		'''
+		if getattr(self.local, 'batch', None) is not None:
+			yield		# nested, the outer block logs the records
+			return
+		self.local.batch = bytearray()
+		try:
+			yield
+		finally:
+			records = self.local.batch
+			self.local.batch = None
+			if records:
+				self._append(self.encode_batch(bytes(records)))
+
+	def sync(self):
+		'''
+			return once every record appended so far is fsynced (always policy)
+		'''
+		with self.lock:
+			self._wait_synced_locked(self.appended)
+
+	def _wait_synced_locked(self, sequence):
+		while self.written < sequence:
+			if self.closed:
+				raise RuntimeError("append only file is closed")
+			if self.writing:
+				# an fsync is running, the next one will include this record
+				self.synced.wait()
+			else:
+				self._write_locked(sync=True)
+
+	def _write_locked(self, sync):
+		'''
+			write the buffer as the leader of a group, the lock is released
+			during the write and fsync so other writers can keep appending
+		'''
+		data = self.buffer
+		sequence = self.appended
+		self.buffer = bytearray()
+		self.writing = True
+		file = self.file
+		self.lock.release()
+		try:
+			file.write(data)
+			file.flush()
+			if sync:
+				os.fsync(file.fileno())
+		finally:
+			self.lock.acquire()
+			self.writing = False
+			self.written = max(self.written, sequence)
+			self.synced.notify_all()
+
+	def _flush_every_second(self):
+		while True:
+			with self.lock:
+				if self.closed:
+					return
+				self.synced.wait(1.0)
+				if self.closed:
+					return
+				if self.buffer and not self.writing:
+					self._write_locked(sync=self.fsync_policy == self.EVERYSEC)
+
+	def on_put(self, key, value, old_value, existed):
+		self.append(self.PUT, key, value)
+
+	def on_delete(self, key, old_value):
+		self.append(self.DELETE, key)
+
+	def rewrite(self, items):
+		'''
+			start compacting the log in a background thread
+			items is a copy of the database taken by the caller, e.g. dict(storage)
+		'''
+		with self.lock:
+			if self.rewrite_buffer is not None:
+				raise RuntimeError("a rewrite is already running")
+			self.rewrite_buffer = bytearray()
+		self.rewrite_thread = threading.Thread(target=self._rewrite, args=(items,), daemon=True)
+		self.rewrite_thread.start()
+		return self.rewrite_thread
+
+	def _rewrite(self, items):
+		temporary_path = self.path + '.rewrite'
+		try:
+			with open(temporary_path, 'wb') as new_log:
+				chunk = bytearray()
+				for key, value in items.items():
+					chunk += self.encode_record(self.PUT, key, value)
+					if len(chunk) >= self.READ_CHUNK:
+						new_log.write(chunk)
+						chunk = bytearray()
+				new_log.write(chunk)
+				with self.lock:
+					# records appended while the copy was written, then swap logs
+					while self.writing:
+						self.synced.wait()
+					new_log.write(self.rewrite_buffer)
+					new_log.flush()
+					os.fsync(new_log.fileno())
+					os.replace(temporary_path, self.path)
+					self.file.close()
+					self.file = open(self.path, 'ab')
+					# buffered records are already in the new log
+					self.buffer = bytearray()
+					self.written = self.appended
+					self.rewrite_buffer = None
+		except BaseException:
+			with self.lock:
+				self.rewrite_buffer = None
+			if os.path.exists(temporary_path):
+				os.remove(temporary_path)
+			raise
+
+	def close(self):
+		'''
+			wait for a running rewrite, write and fsync everything and close
+		'''
+		if self.rewrite_thread is not None:
+			self.rewrite_thread.join()
+		with self.lock:
+			while self.writing:
+				self.synced.wait()
+			if self.buffer:
+				self._write_locked(sync=True)
+			self.closed = True
+			self.synced.notify_all()
+			self.file.close()
+		if self.flusher is not None:
+			self.flusher.join()
@@ -0,0 +1,77 @@
+'''
+	Requests per second of the RESP server for several pipeline depths.
+	The server runs in a child process, clients are asyncio connections
+	sending batches of SET and GET with 16 byte values.
+
+	run from LowLevelDesign/Cache
+		python -m database.benchmarks.server_benchmark [connections] [requests per connection]
+'''
+import asyncio
+import multiprocessing
+import sys
+import time
+
+from database.resp import encode_array
+from database.server import Server
+from in_memory_database import Database, Interface
+
+PIPELINES = (1, 16, 128)
+KEY_SPACE = 10_000
+VALUE = b'v' * 16
+
+
+def serve(port, ready):
+	async def main():
+		server = Server(Interface(Database()), port=port)
+		await server.start()
+		ready.put(server.port)
+		await server.serve_forever()
+	asyncio.run(main())
+
+
+async def client(port, requests, pipeline, seed):
+	reader, writer = await asyncio.open_connection('127.0.0.1', port)
+	set_reply = b'+OK\r\n'
+	get_reply = b'$%d\r\n%b\r\n' % (len(VALUE), VALUE)
+	index = seed
+	for _ in range(requests // pipeline):
+		batch = []
+		reply_size = 0
+		for _ in range(pipeline):
+			key = b'key:%d' % (index % KEY_SPACE)
+			if index % 2:
+				batch.append(encode_array([b'SET', key, VALUE]))
+				reply_size += len(set_reply)
+			else:
+				batch.append(encode_array([b'SET', key, VALUE]) + encode_array([b'GET', key]))
+				reply_size += len(set_reply) + len(get_reply)
+			index += 7919
+		writer.write(b''.join(batch))
+		await reader.readexactly(reply_size)
+	writer.close()
+	await writer.wait_closed()
+
+
+async def run(port, connections, requests, pipeline):
+	start = time.perf_counter()
+	await asyncio.gather(*(client(port, requests, pipeline, seed) for seed in range(connections)))
+	# every other pipelined entry is a SET followed by a GET
+	return connections * (requests // pipeline) * pipeline * 1.5 / (time.perf_counter() - start)
+
+
+def main(connections=16, requests=20_000):
+	ready = multiprocessing.Queue()
+	server = multiprocessing.Process(target=serve, args=(0, ready), daemon=True)
+	server.start()
+	port = ready.get()
+	print(f"{connections} connections, {requests} pipelined entries each")
+	print(f"{'pipeline':<12}{'requests/sec':>14}")
+	try:
+		for pipeline in PIPELINES:
+			print(f"{pipeline:<12}{asyncio.run(run(port, connections, requests, pipeline)):>14,.0f}")
+	finally:
+		server.terminate()
+
+
+if __name__ == "__main__":
+	main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,261 @@
+'''
+	Keys partitioned over shard processes by consistent hashing.
+
+	Every shard is a Database behind a RESP Server in its own process.
+	ClusterRouter is the client: it finds the shard of each key on a
+	ConsistentHashRing, groups multi key requests by shard and sends each
+	group as one pipeline, all shards in parallel.
+
+	Adding a shard moves only the keys whose owner changed, a few at a time
+	from every router call (like an incremental rehash), so the cluster keeps
+	serving. Moves and requests are done by the same router one after the
+	other, so the router must be the only client writing to the cluster.
+	A step copies its keys to the new shard and then deletes them from the
+	old one. If it fails in between, the keys are in both shards until the
+	next call retries the step from the same scan cursor. Reads check the
+	new shard first, and writes delete the old copy, so the retry never
+	brings back an overwritten value.
+
+	An error reply from a shard is raised as RespError.
+'''
+import asyncio
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+
+from database.algorithms.consistent_hash_ring import ConsistentHashRing
+from database.resp import RespError
+from database.resp_client import RespClient
+
+
+def run_shard(host, ready):
+	'''
+		process target, serve a new database and report the port
+	'''
+	from in_memory_database import Database, Interface
+	from database.server import Server
+
+	async def serve():
+		server = Server(Interface(Database()), host, 0)
+		await server.start()
+		ready.put(server.port)
+		await server.serve_forever()
+	asyncio.run(serve())
+
+
+class ClusterRouter:
+	MIGRATION_STEP = 100
+
+	def __init__(self, addresses, vnode_count=ConsistentHashRing.VNODE_COUNT) -> None:
+		'''
+			addresses maps shard name to (host, port)
+		'''
+		self.ring = ConsistentHashRing(addresses, vnode_count)
+		self.clients = {name: RespClient(address) for name, address in addresses.items()}
+		self.executor = ThreadPoolExecutor(max_workers=32)
+		self.migration = None
+
+	def _send(self, batches):
+		'''
+			batches maps shard name to commands, return shard name to replies
+			shards are sent to in parallel
+		'''
+		if len(batches) == 1:
+			(name, commands), = batches.items()
+			return {name: self._checked(self.clients[name].pipeline(commands))}
+		futures = {name: self.executor.submit(self.clients[name].pipeline, commands)
+			for name, commands in batches.items()}
+		return {name: self._checked(future.result()) for name, future in futures.items()}
+
+	@staticmethod
+	def _checked(replies):
+		'''
+			replies of a pipeline, raise the first error reply
+		'''
+		for reply in replies:
+			if isinstance(reply, RespError):
+				raise reply
+		return replies
+
+	def _group(self, keys):
+		groups = {}
+		for key in keys:
+			groups.setdefault(self.ring.node_for(key), []).append(key)
+		return groups
+
+	def _previous_owner(self, key):
+		'''
+			shard a key may still be in while shards are rebalanced, else None
+		'''
+		if self.migration is None or self.ring.node_for(key) != self.migration.target:
+			return None
+		return self.migration.old_ring.node_for(key)
+
+	def put_many(self, items):
+		self.rebalance_step()
+		items = dict(items)
+		batches = {}
+		for name, keys in self._group(items).items():
+			batches.setdefault(name, []).extend(('set', key, items[key]) for key in keys)
+		for key in items:
+			# a moved key written to its new shard must not stay in the old one
+			previous = self._previous_owner(key)
+			if previous is not None:
+				batches.setdefault(previous, []).append(('del', key))
+		self._send(batches)
+
+	def put(self, key, value):
+		self.put_many({key: value})
+
+	def get_many(self, keys):
+		'''
+			dict of the keys found and their values
+		'''
+		self.rebalance_step()
+		keys = list(keys)
+		groups = self._group(keys)
+		replies = self._send({name: [('get', key) for key in group] for name, group in groups.items()})
+		found = {}
+		missing = []
+		for name, group in groups.items():
+			for key, value in zip(group, replies[name]):
+				if value is not None:
+					found[key] = value
+				elif self._previous_owner(key) is not None:
+					missing.append(key)
+		if missing:
+			# not moved yet
+			batches = {}
+			for key in missing:
+				batches.setdefault(self._previous_owner(key), []).append(key)
+			replies = self._send({name: [('get', key) for key in group] for name, group in batches.items()})
+			for name, group in batches.items():
+				found.update((key, value) for key, value in zip(group, replies[name]) if value is not None)
+		return found
+
+	def get(self, key):
+		return self.get_many([key]).get(key)
+
+	def delete_many(self, keys):
+		'''
+			return the number of keys deleted, a key still in two shards counts once
+		'''
+		self.rebalance_step()
+		batches = {}
+		for key in keys:
+			batches.setdefault(self.ring.node_for(key), []).append(('del', key))
+			previous = self._previous_owner(key)
+			if previous is not None:
+				batches.setdefault(previous, []).append(('del', key))
+		replies = self._send(batches)
+		deleted = set()
+		for name, commands in batches.items():
+			deleted.update(key for (_, key), count in zip(commands, replies[name]) if count)
+		return len(deleted)
+
+	def delete(self, key):
+		return self.delete_many([key])
+
+	def keys(self):
+		'''
+			keys of all shards, a key still in two shards is listed once
+		'''
+		replies = self._send({name: [('keys',)] for name in self.clients})
+		return list(dict.fromkeys(key for shard_replies in replies.values() for key in shard_replies[0]))
+
+	def add_shard(self, name, address):
+		'''
+			add a shard to the ring, its keys move over from the other shards
+			with the next router calls or rebalance()
+		'''
+		if self.migration is not None:
+			self.rebalance()
+		old_ring = ConsistentHashRing(self.ring.nodes, self.ring.vnode_count)
+		self.ring.add_node(name)
+		self.clients[name] = RespClient(address)
+		self.migration = Migration(name, old_ring, sorted(old_ring.nodes))
+
+	def rebalance_step(self, count=MIGRATION_STEP):
+		'''
+			move up to count keys of the source shard being scanned
+		'''
+		migration = self.migration
+		if migration is None:
+			return 0
+		source = self.clients[migration.sources[0]]
+		cursor, keys = source.execute('scan', migration.cursor, 'count', count)
+		moving = [key for key in keys if self.ring.node_for(key) == migration.target]
+		if moving:
+			values = self._checked(source.pipeline([('get', key) for key in moving]))
+			moving = [(key, value) for key, value in zip(moving, values) if value is not None]
+			self._checked(self.clients[migration.target].pipeline([('set', key, value) for key, value in moving]))
+			self._checked(source.pipeline([('del', key) for key, _ in moving]))
+			migration.moved += len(moving)
+		# the cursor advances only once the keys moved, a failed step is retried
+		migration.cursor = int(cursor)
+		if migration.cursor == 0:
+			migration.sources.pop(0)
+			if not migration.sources:
+				self.migration = None
+		return len(moving)
+
+	def rebalance(self):
+		'''
+			finish moving keys to the added shard, return how many were moved
+		'''
+		moved = 0
+		while self.migration is not None:
+			moved += self.rebalance_step(self.MIGRATION_STEP * 10)
+		return moved
+
+	def close(self):
+		self.executor.shutdown()
+		for client in self.clients.values():
+			client.close()
+
+
+class Migration:
+	'''
+		keys moving to target, source shards are scanned one after the other
+	'''
+	def __init__(self, target, old_ring, sources) -> None:
+		self.target = target
+		self.old_ring = old_ring
+		self.sources = sources
+		self.cursor = 0
+		self.moved = 0
+
+
+class Cluster:
+	'''
+		starts shard processes on this host and a router in front of them
+	'''
+	def __init__(self, shard_count, host='127.0.0.1', vnode_count=ConsistentHashRing.VNODE_COUNT) -> None:
+		self.host = host
+		self.processes = {}
+		addresses = {}
+		for index in range(shard_count):
+			name = f'shard-{index}'
+			addresses[name] = self._start_shard(name)
+		self.router = ClusterRouter(addresses, vnode_count)
+
+	def _start_shard(self, name):
+		ready = multiprocessing.Queue()
+		process = multiprocessing.Process(target=run_shard, args=(self.host, ready), name=name, daemon=True)
+		process.start()
+		self.processes[name] = process
+		return self.host, ready.get()
+
+	def add_shard(self):
+		'''
+			start one more shard, keys move to it while the cluster keeps serving
+		'''
+		name = f'shard-{len(self.processes)}'
+		self.router.add_shard(name, self._start_shard(name))
+		return name
+
+	def close(self):
+		self.router.close()
+		for process in self.processes.values():
+			process.terminate()
+		for process in self.processes.values():
+			process.join()
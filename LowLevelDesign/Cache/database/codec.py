@@ -0,0 +1,21 @@
+'''
+	Binary encoding of keys and values for the append only file and snapshots.
+	Strings (what the command line produces) are stored as utf-8, anything
+	else is pickled. The first byte tells which one.
+'''
+import pickle
+
+STRING = b's'
+PICKLE = b'p'
+
+
+def encode(obj):
+	if type(obj) is str:
+		return STRING + obj.encode('utf-8')
+	return PICKLE + pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def decode(data):
+	if data[:1] == STRING:
+		return str(data[1:], 'utf-8')
+	return pickle.loads(data[1:])
@@ -0,0 +1,19 @@
+from abc import ABC
+
+
+class DatabaseListener(ABC):
+	'''
+		Gets told about every change made to a Database, after it is applied.
+		Persistence, indexes and replication are listeners.
+	'''
+	def on_put(self, key, value, old_value, existed):
+		'''
+			old_value is only meaningful when existed is True
+		'''
+		pass
+
+	def on_delete(self, key, old_value):
+		pass
+
+	def close(self):
+		pass
@@ -0,0 +1,5 @@
+class CorruptedAppendOnlyFileException(Exception):
+	'''
+		Append only file has a corrupted record followed by more data
+	'''
+	pass
@@ -0,0 +1,5 @@
+class CorruptedSnapshotException(Exception):
+	'''
+		Snapshot file is truncated or its checksum doesn't match
+	'''
+	pass
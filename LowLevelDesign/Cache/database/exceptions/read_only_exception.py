@@ -0,0 +1,5 @@
+class ReadOnlyException(Exception):
+	'''
+		Write sent to a follower, writes go to the leader
+	'''
+	pass
@@ -0,0 +1,50 @@
+from fnmatch import fnmatchcase
+
+from database.database_listener import DatabaseListener
+
+EMPTY = object()
+
+
+class KeySlots(DatabaseListener):
+	'''
+		Every key of the database in a slot of a list, for cursor based scans.
+
+		A key keeps its slot until it is deleted, a freed slot is reused by a
+		later key. So a scan walking the slots in order with the cursor as
+		position returns every key which exists for the whole scan exactly
+		once. Keys added or deleted meanwhile may be missed, a key deleted
+		and added again can be returned twice.
+		The list is as long as the most keys there ever were, holes are
+		skipped by the scan.
+	'''
+	def __init__(self, storage) -> None:
+		self.slots = list(storage)
+		self.positions = {key: slot for slot, key in enumerate(self.slots)}
+		self.free = []
+
+	def on_put(self, key, value, old_value, existed):
+		if existed:
+			return
+		if self.free:
+			slot = self.free.pop()
+			self.slots[slot] = key
+		else:
+			slot = len(self.slots)
+			self.slots.append(key)
+		self.positions[key] = slot
+
+	def on_delete(self, key, old_value):
+		slot = self.positions.pop(key)
+		self.slots[slot] = EMPTY
+		self.free.append(slot)
+
+	def scan(self, cursor, count, match=None):
+		'''
+			keys in the count slots from cursor and the next cursor, 0 when done
+			with match only string keys matching the glob pattern are returned
+		'''
+		end = cursor + count
+		keys = [key for key in self.slots[cursor:end] if key is not EMPTY]
+		if match is not None:
+			keys = [key for key in keys if type(key) is str and fnmatchcase(key, match)]
+		return (end if end < len(self.slots) else 0), keys
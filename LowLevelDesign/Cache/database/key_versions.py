@@ -0,0 +1,29 @@
+from array import array
+
+from database.database_listener import DatabaseListener
+
+
+class KeyVersions(DatabaseListener):
+	'''
+		Version counters bumped by every put and delete, for WATCH.
+
+		Keys share a fixed array of counters by hash, so the memory is the
+		same for any number of keys and the cost of a write is one increment.
+		Two keys on the same counter look like each other's writes, which
+		only makes a watching transaction abort when it didn't have to.
+	'''
+	def __init__(self, counter_count=1 << 16) -> None:
+		self.counters = array('Q', bytes(8 * counter_count))
+
+	def version(self, key):
+		return self.counters[hash(key) % len(self.counters)]
+
+	def _bump(self, key):
+		index = hash(key) % len(self.counters)
+		self.counters[index] = (self.counters[index] + 1) & 0xFFFFFFFFFFFFFFFF
+
+	def on_put(self, key, value, old_value, existed):
+		self._bump(key)
+
+	def on_delete(self, key, old_value):
+		self._bump(key)
@@ -0,0 +1,181 @@
+import re
+import threading
+from collections import deque, namedtuple
+from fnmatch import translate
+
+from database.database_listener import DatabaseListener
+
+KeyspaceEvent = namedtuple('KeyspaceEvent', ['kind', 'key', 'pattern'])
+GLOB_CHARACTERS = re.compile(r'[*?\[]')
+
+
+class Subscription:
+	'''
+		Events for the keys and glob patterns a subscriber registered, in a
+		bounded queue. Publishing never waits for the subscriber: when the
+		queue is full drop_policy either drops the oldest queued event or the
+		new one, dropped counts them.
+
+		get() blocks until an event arrives, drain() takes all queued events.
+		on_event is called (on the publishing thread) when an event is
+		queued, e.g. to wake up an event loop.
+	'''
+	DROP_OLDEST = 'drop_oldest'
+	DROP_NEWEST = 'drop_newest'
+
+	def __init__(self, notifier, max_queue=1000, drop_policy=DROP_OLDEST, on_event=None) -> None:
+		if drop_policy not in (self.DROP_OLDEST, self.DROP_NEWEST):
+			raise ValueError(f"unknown drop policy {drop_policy}")
+		self.notifier = notifier
+		self.max_queue = max_queue
+		self.drop_policy = drop_policy
+		self.on_event = on_event
+		self.queue = deque()
+		self.dropped = 0
+		self.keys = set()
+		self.patterns = set()
+		self.condition = threading.Condition()
+
+	def subscribe(self, *keys):
+		for key in keys:
+			if key not in self.keys:
+				self.keys.add(key)
+				self.notifier.add_key(self, key)
+
+	def psubscribe(self, *patterns):
+		for pattern in patterns:
+			if pattern not in self.patterns:
+				self.patterns.add(pattern)
+				self.notifier.add_pattern(self, pattern)
+
+	def unsubscribe(self, *keys):
+		for key in keys or list(self.keys):
+			if key in self.keys:
+				self.keys.remove(key)
+				self.notifier.remove_key(self, key)
+
+	def punsubscribe(self, *patterns):
+		for pattern in patterns or list(self.patterns):
+			if pattern in self.patterns:
+				self.patterns.remove(pattern)
+				self.notifier.remove_pattern(self, pattern)
+
+	def push(self, event):
+		with self.condition:
+			if len(self.queue) >= self.max_queue:
+				self.dropped += 1
+				if self.drop_policy == self.DROP_NEWEST:
+					return
+				self.queue.popleft()
+			self.queue.append(event)
+			self.condition.notify()
+		if self.on_event is not None:
+			self.on_event()
+
+	def get(self, timeout=None):
+		'''
+			next event, None if there was none for timeout seconds
+		'''
+		with self.condition:
+			if not self.queue:
+				self.condition.wait(timeout)
+			return self.queue.popleft() if self.queue else None
+
+	def drain(self):
+		with self.condition:
+			events = list(self.queue)
+			self.queue.clear()
+			return events
+
+	def close(self):
+		self.unsubscribe()
+		self.punsubscribe()
+
+
+class KeyspaceNotifier(DatabaseListener):
+	'''
+		Publishes put and delete events to subscriptions.
+
+		Exact keys are a dict lookup. Patterns are compiled once and indexed
+		by their literal prefix (what comes before the first *, ? or [), so
+		an event only tries the patterns whose prefix starts its key: one
+		lookup per distinct prefix length, not a match per pattern.
+	'''
+	def __init__(self) -> None:
+		self.exact = {}			# key: subscriptions
+		self.patterns = {}		# literal prefix: {pattern: (compiled, subscriptions)}
+		self.length_counts = {}		# length of prefix: number of prefixes
+		self.prefix_lengths = []	# sorted distinct lengths of the prefixes
+
+	def subscription(self, max_queue=1000, drop_policy=Subscription.DROP_OLDEST, on_event=None):
+		return Subscription(self, max_queue, drop_policy, on_event)
+
+	def add_key(self, subscription, key):
+		self.exact.setdefault(key, set()).add(subscription)
+
+	def remove_key(self, subscription, key):
+		subscriptions = self.exact[key]
+		subscriptions.discard(subscription)
+		if not subscriptions:
+			del self.exact[key]
+
+	@staticmethod
+	def _prefix(pattern):
+		glob = GLOB_CHARACTERS.search(pattern)
+		return pattern if glob is None else pattern[:glob.start()]
+
+	def add_pattern(self, subscription, pattern):
+		prefix = self._prefix(pattern)
+		bucket = self.patterns.get(prefix)
+		if bucket is None:
+			bucket = self.patterns[prefix] = {}
+			self._count_length(len(prefix), 1)
+		if pattern not in bucket:
+			bucket[pattern] = (re.compile(translate(pattern)), set())
+		bucket[pattern][1].add(subscription)
+
+	def remove_pattern(self, subscription, pattern):
+		prefix = self._prefix(pattern)
+		bucket = self.patterns[prefix]
+		subscriptions = bucket[pattern][1]
+		subscriptions.discard(subscription)
+		if subscriptions:
+			return
+		del bucket[pattern]
+		if not bucket:
+			del self.patterns[prefix]
+			self._count_length(len(prefix), -1)
+
+	def _count_length(self, length, change):
+		count = self.length_counts.get(length, 0) + change
+		if count:
+			self.length_counts[length] = count
+		else:
+			del self.length_counts[length]
+		self.prefix_lengths = sorted(self.length_counts)
+
+	def publish(self, kind, key):
+		subscriptions = self.exact.get(key)
+		if subscriptions:
+			event = KeyspaceEvent(kind, key, None)
+			for subscription in list(subscriptions):
+				subscription.push(event)
+		if not self.patterns or type(key) is not str:
+			return
+		for length in self.prefix_lengths:
+			if length > len(key):
+				break
+			bucket = self.patterns.get(key[:length])
+			if bucket is None:
+				continue
+			for pattern, (compiled, subscriptions) in list(bucket.items()):
+				if compiled.match(key):
+					event = KeyspaceEvent(kind, key, pattern)
+					for subscription in list(subscriptions):
+						subscription.push(event)
+
+	def on_put(self, key, value, old_value, existed):
+		self.publish('put', key)
+
+	def on_delete(self, key, old_value):
+		self.publish('delete', key)
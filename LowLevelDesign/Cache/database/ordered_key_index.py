@@ -0,0 +1,47 @@
+from itertools import islice
+
+from database.algorithms.skip_list import SkipList
+from database.database_listener import DatabaseListener
+
+
+class OrderedKeyIndex(DatabaseListener):
+	'''
+		String keys of the database kept sorted in a SkipList, so prefix and
+		range scans cost O(log n + k) for k returned keys. Keys of other types
+		don't sort against strings and are not indexed.
+	'''
+	def __init__(self, storage) -> None:
+		self.keys = SkipList()
+		for key in storage:
+			self.on_put(key, None, None, False)
+
+	def on_put(self, key, value, old_value, existed):
+		if not existed and type(key) is str:
+			self.keys.insert(key)
+
+	def on_delete(self, key, old_value):
+		if type(key) is str:
+			self.keys.remove(key)
+
+	def range(self, start=None, end=None, limit=None, reverse=False):
+		'''
+			keys in [start, end), at most limit of them
+		'''
+		return list(islice(self.keys.iterate(start, end, reverse), limit))
+
+	def prefixed(self, prefix, limit=None, reverse=False):
+		'''
+			keys starting with prefix
+		'''
+		return self.range(prefix, prefix_end(prefix), limit, reverse)
+
+
+def prefix_end(prefix):
+	'''
+		smallest string greater than every string starting with prefix,
+		None when there is none (empty prefix or only max code points)
+	'''
+	prefix = prefix.rstrip(chr(0x10FFFF))
+	if not prefix:
+		return None
+	return prefix[:-1] + chr(ord(prefix[-1]) + 1)
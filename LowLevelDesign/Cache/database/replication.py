@@ -0,0 +1,336 @@
+'''
+	Leader-follower replication.
+
+	The leader's ReplicationLog is a listener encoding every change as an
+	append only file record into a backlog, the replication offset is the
+	number of bytes produced so far. Followers connect over TCP (host, port)
+	or a unix socket (path) and send
+
+		SYNC <replication id> <offset> <announced address>\\n
+
+	If the id is the leader's and the offset still in the backlog the leader
+	answers CONTINUE\\n and streams from there, so a follower reconnecting
+	after a short break gets only what it missed. Otherwise it answers
+	FULLSYNC <replication id> <offset> <size>\\n followed by a snapshot of
+	size bytes taken at that offset, then streams from the offset.
+
+	Both sides touch the database only in Database.tick(), on the thread
+	serving commands. Socket work happens in background threads.
+'''
+import os
+import socket
+import tempfile
+import threading
+import time
+from collections import deque
+
+from database.append_only_file import AppendOnlyFile
+from database.database_listener import DatabaseListener
+from database.snapshot import load_snapshot, write_snapshot
+
+
+def parse_address(text):
+	'''
+		host:port for TCP, anything else is a unix socket path
+	'''
+	host, separator, port = text.rpartition(':')
+	if separator and port.isdigit():
+		return host, int(port)
+	return text
+
+
+def listen(address):
+	if isinstance(address, str):
+		if os.path.exists(address):
+			os.remove(address)
+		server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+	else:
+		server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+		server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+	server.bind(address)
+	server.listen()
+	return server
+
+
+def connect(address):
+	if isinstance(address, str):
+		connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+		connection.connect(address)
+		return connection
+	return socket.create_connection(address)
+
+
+class SocketReader:
+	'''
+		buffered reads of lines and exact sizes from a socket
+	'''
+	def __init__(self, connection) -> None:
+		self.connection = connection
+		self.buffer = bytearray()
+
+	def fill(self):
+		data = self.connection.recv(1 << 16)
+		if not data:
+			raise ConnectionError("connection closed")
+		self.buffer += data
+
+	def line(self):
+		while b'\n' not in self.buffer:
+			self.fill()
+		end = self.buffer.index(b'\n')
+		line = bytes(self.buffer[:end])
+		del self.buffer[:end + 1]
+		return line.decode()
+
+	def take(self):
+		data = bytes(self.buffer)
+		self.buffer.clear()
+		return data
+
+
+class ReplicationLog(DatabaseListener):
+	'''
+		leader side, keeps the last backlog_size bytes of changes for followers
+	'''
+	BACKLOG_SIZE = 16 << 20
+
+	def __init__(self, database, address, backlog_size=BACKLOG_SIZE) -> None:
+		self.database = database
+		self.replication_id = os.urandom(16).hex()
+		self.offset = 0
+		self.backlog = bytearray()
+		self.backlog_start = 0		# offset of the first byte of backlog
+		self.backlog_size = backlog_size
+		self.condition = threading.Condition()
+		self.full_sync_requests = []
+		self.followers = {}		# connection: address the follower announced
+		self.closed = False
+		self.server = listen(address)
+		self.address = self.server.getsockname()
+		threading.Thread(target=self._accept, daemon=True).start()
+
+	def _append(self, record):
+		with self.condition:
+			self.backlog += record
+			self.offset += len(record)
+			if len(self.backlog) > 2 * self.backlog_size:
+				# trim in big steps so appends stay amortized O(1)
+				trimmed = len(self.backlog) - self.backlog_size
+				del self.backlog[:trimmed]
+				self.backlog_start += trimmed
+			self.condition.notify_all()
+
+	def on_put(self, key, value, old_value, existed):
+		self._append(AppendOnlyFile.encode_record(AppendOnlyFile.PUT, key, value))
+
+	def on_delete(self, key, old_value):
+		self._append(AppendOnlyFile.encode_record(AppendOnlyFile.DELETE, key))
+
+	def tick(self):
+		'''
+			called on the database thread: hand a copy of the data and its
+			offset to followers waiting for a full sync
+		'''
+		with self.condition:
+			if not self.full_sync_requests:
+				return
+			items = dict(self.database.storage)
+			for request in self.full_sync_requests:
+				request.append((items, self.offset))
+			self.full_sync_requests.clear()
+			self.condition.notify_all()
+
+	def _accept(self):
+		while not self.closed:
+			try:
+				connection, _ = self.server.accept()
+			except OSError:
+				return
+			threading.Thread(target=self._serve_follower, args=(connection,), daemon=True).start()
+
+	def _serve_follower(self, connection):
+		try:
+			command, replication_id, offset, announced = SocketReader(connection).line().split(' ', 3)
+			if command != 'SYNC':
+				return
+			offset = int(offset)
+			with self.condition:
+				partial = replication_id == self.replication_id and self.backlog_start <= offset <= self.offset
+				self.followers[connection] = announced
+			if partial:
+				connection.sendall(b'CONTINUE\n')
+			else:
+				offset = self._full_sync(connection)
+			self._stream(connection, offset)
+		except (OSError, ValueError):
+			pass
+		finally:
+			with self.condition:
+				self.followers.pop(connection, None)
+			connection.close()
+
+	def _full_sync(self, connection):
+		'''
+			send a snapshot and return the offset it was taken at
+		'''
+		request = []
+		with self.condition:
+			self.full_sync_requests.append(request)
+			while not request and not self.closed:
+				self.condition.wait(1.0)
+		if not request:
+			raise ConnectionError("replication closed")
+		items, offset = request[0]
+		descriptor, path = tempfile.mkstemp(suffix='.snapshot')
+		os.close(descriptor)
+		try:
+			write_snapshot(path, items.items())
+			del items
+			size = os.path.getsize(path)
+			connection.sendall(f'FULLSYNC {self.replication_id} {offset} {size}\n'.encode())
+			with open(path, 'rb') as snapshot:
+				connection.sendfile(snapshot)
+		finally:
+			os.remove(path)
+		return offset
+
+	def _stream(self, connection, position):
+		while True:
+			with self.condition:
+				while position == self.offset and not self.closed:
+					self.condition.wait(1.0)
+				if self.closed:
+					return
+				if position < self.backlog_start:
+					return		# follower fell behind the backlog, it will resync
+				data = bytes(self.backlog[position - self.backlog_start:])
+			connection.sendall(data)
+			position += len(data)
+
+	def follower_addresses(self):
+		'''
+			addresses announced by the connected followers, where reads can go
+		'''
+		with self.condition:
+			return [address for address in self.followers.values() if address != '-']
+
+	def close(self):
+		with self.condition:
+			self.closed = True
+			self.condition.notify_all()
+			followers = list(self.followers)
+		self.server.close()
+		for connection in followers:
+			try:
+				connection.shutdown(socket.SHUT_RDWR)
+			except OSError:
+				pass
+
+
+class Follower:
+	'''
+		follower side, receives the leader's stream in a background thread,
+		tick() applies it to the database. Reconnects resume from the offset
+		received so far.
+	'''
+	RETRY_INTERVAL = 1.0
+
+	def __init__(self, database, address, announce=None) -> None:
+		self.database = database
+		self.address = address
+		self.announce = announce or '-'
+		self.replication_id = '?'
+		self.offset = 0			# of the last change received
+		self.applied_offset = 0		# of the last change applied
+		self.inbox = deque()
+		self.connected = False
+		self.closed = False
+		self.connection = None
+		self.thread = threading.Thread(target=self._run, daemon=True)
+		self.thread.start()
+
+	def _run(self):
+		while not self.closed:
+			try:
+				self.connection = connect(self.address)
+				self._replicate(self.connection)
+			except (OSError, ValueError, ConnectionError):
+				pass
+			finally:
+				self.connected = False
+				if self.connection is not None:
+					self.connection.close()
+			if not self.closed:
+				time.sleep(self.RETRY_INTERVAL)
+
+	def _replicate(self, connection):
+		connection.sendall(f'SYNC {self.replication_id} {self.offset} {self.announce}\n'.encode())
+		reader = SocketReader(connection)
+		reply = reader.line().split()
+		if reply[0] == 'FULLSYNC':
+			replication_id, offset, size = reply[1], int(reply[2]), int(reply[3])
+			self.inbox.append(('full', self._receive_snapshot(reader, size), offset))
+			self.replication_id = replication_id
+			self.offset = offset
+		elif reply[0] != 'CONTINUE':
+			raise ValueError(f"unexpected reply {reply}")
+		self.connected = True
+		pending = reader.take()
+		while True:
+			records, used, corrupted = AppendOnlyFile.decode_records(pending)
+			if corrupted:
+				raise ValueError("corrupted replication stream")
+			if records:
+				self.offset += used
+				self.inbox.append(('records', records, self.offset))
+				pending = pending[used:]
+			data = connection.recv(1 << 16)
+			if not data:
+				raise ConnectionError("leader closed the connection")
+			pending += data
+
+	def _receive_snapshot(self, reader, size):
+		descriptor, path = tempfile.mkstemp(suffix='.snapshot')
+		try:
+			with os.fdopen(descriptor, 'wb') as snapshot:
+				received = min(len(reader.buffer), size)
+				snapshot.write(reader.buffer[:received])
+				del reader.buffer[:received]
+				while received < size:
+					data = reader.connection.recv(min(1 << 20, size - received))
+					if not data:
+						raise ConnectionError("leader closed the connection")
+					snapshot.write(data)
+					received += len(data)
+			return load_snapshot(path)
+		finally:
+			os.remove(path)
+
+	def tick(self):
+		'''
+			called on the database thread, applies what was received
+		'''
+		database = self.database
+		while self.inbox:
+			kind, payload, offset = self.inbox.popleft()
+			if kind == 'full':
+				for key in [key for key in database.storage if key not in payload]:
+					database.apply_delete(key)
+				for key, value in payload.items():
+					database.apply_put(key, value)
+			else:
+				for op, key, value in payload:
+					if op == AppendOnlyFile.PUT:
+						database.apply_put(key, value)
+					else:
+						database.apply_delete(key)
+			self.applied_offset = offset
+
+	def close(self):
+		self.closed = True
+		if self.connection is not None:
+			try:
+				self.connection.shutdown(socket.SHUT_RDWR)
+			except OSError:
+				pass
+		self.thread.join()
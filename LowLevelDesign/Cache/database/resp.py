@@ -0,0 +1,122 @@
+'''
+	RESP (REdis Serialization Protocol) parsing and encoding.
+
+	Requests are arrays of bulk strings (*2\r\n$3\r\nget\r\n$1\r\na\r\n), or
+	inline commands (get a\r\n) as typed in telnet. Replies are simple strings,
+	errors, integers, bulk strings (null for None) and arrays of those.
+'''
+
+CRLF = b'\r\n'
+OK = b'+OK\r\n'
+NULL = b'$-1\r\n'
+NULL_ARRAY = b'*-1\r\n'
+
+
+class ProtocolError(Exception):
+	pass
+
+
+class RespError(Exception):
+	'''
+		error reply of a server
+	'''
+	pass
+
+
+class RespParser:
+	'''
+		collects received bytes and returns every complete command in them
+		a command cut between two reads is finished by the next feed
+	'''
+	MAX_BULK_LENGTH = 512 << 20
+	MAX_INLINE_LENGTH = 64 << 10
+
+	def __init__(self) -> None:
+		self.buffer = bytearray()
+
+	def feed(self, data):
+		'''
+			return list of commands, a command is a list of bytes arguments
+		'''
+		self.buffer += data
+		buffer = self.buffer
+		commands = []
+		position = 0
+		while position < len(buffer):
+			if buffer[position] == 0x2A:		# '*'
+				command, end = self._parse_array(buffer, position)
+			else:
+				command, end = self._parse_inline(buffer, position)
+			if end == -1:
+				break
+			position = end
+			if command:
+				commands.append(command)
+		del buffer[:position]
+		return commands
+
+	def _parse_inline(self, buffer, position):
+		line_end = buffer.find(b'\n', position)
+		if line_end == -1:
+			if len(buffer) - position > self.MAX_INLINE_LENGTH:
+				raise ProtocolError("inline command too long")
+			return None, -1
+		return bytes(buffer[position:line_end]).split(), line_end + 1
+
+	def _parse_array(self, buffer, position):
+		line_end = buffer.find(CRLF, position)
+		if line_end == -1:
+			return None, -1
+		count = self._integer(buffer, position + 1, line_end)
+		position = line_end + 2
+		command = []
+		for _ in range(count):
+			line_end = buffer.find(CRLF, position)
+			if line_end == -1:
+				return None, -1
+			if buffer[position] != 0x24:		# '$'
+				raise ProtocolError(f"expected '$', got {chr(buffer[position])!r}")
+			length = self._integer(buffer, position + 1, line_end)
+			if length > self.MAX_BULK_LENGTH:
+				raise ProtocolError("bulk string too long")
+			start = line_end + 2
+			end = start + length
+			if end + 2 > len(buffer):
+				return None, -1
+			if buffer[end:end + 2] != CRLF:
+				raise ProtocolError("expected CRLF after bulk string")
+			command.append(bytes(buffer[start:end]))
+			position = end + 2
+		return command, position
+
+	@staticmethod
+	def _integer(buffer, start, end):
+		try:
+			value = int(buffer[start:end])
+		except ValueError:
+			raise ProtocolError("invalid length") from None
+		if value < 0:
+			raise ProtocolError("negative length")
+		return value
+
+
+def encode_bulk(data):
+	if data is None:
+		return NULL
+	return b'$%d\r\n%b\r\n' % (len(data), data)
+
+
+def encode_integer(value):
+	return b':%d\r\n' % value
+
+
+def encode_simple(text):
+	return b'+' + text.encode() + CRLF
+
+
+def encode_error(message):
+	return b'-ERR ' + message.replace('\r', ' ').replace('\n', ' ').encode() + CRLF
+
+
+def encode_array(items):
+	return b'*%d\r\n' % len(items) + b''.join(encode_bulk(item) for item in items)
@@ -0,0 +1,81 @@
+import socket
+
+from database.resp import ProtocolError, RespError, encode_array
+
+
+class RespClient:
+	'''
+		Blocking RESP client for one server. pipeline() sends many commands
+		with one write and reads all the replies, an error reply is returned
+		as a RespError in place of its reply. Bulk strings come back as str.
+	'''
+	def __init__(self, address) -> None:
+		self.address = address
+		self.connection = socket.create_connection(address)
+		self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+		self.buffer = bytearray()
+		self.position = 0
+
+	@staticmethod
+	def _encode(command):
+		return encode_array([part if isinstance(part, bytes) else str(part).encode('utf-8', 'surrogateescape')
+			for part in command])
+
+	def execute(self, *command):
+		reply = self.pipeline([command])[0]
+		if isinstance(reply, RespError):
+			raise reply
+		return reply
+
+	def pipeline(self, commands):
+		commands = list(commands)
+		if not commands:
+			return []
+		self.connection.sendall(b''.join(self._encode(command) for command in commands))
+		replies = [self._read_reply() for _ in commands]
+		del self.buffer[:self.position]
+		self.position = 0
+		return replies
+
+	def _fill(self):
+		data = self.connection.recv(1 << 16)
+		if not data:
+			raise ConnectionError(f"{self.address} closed the connection")
+		self.buffer += data
+
+	def _line(self):
+		while True:
+			end = self.buffer.find(b'\r\n', self.position)
+			if end != -1:
+				line = bytes(self.buffer[self.position:end])
+				self.position = end + 2
+				return line
+			self._fill()
+
+	def _read_reply(self):
+		line = self._line()
+		kind, rest = line[:1], line[1:]
+		if kind == b'+':
+			return rest.decode()
+		if kind == b'-':
+			return RespError(rest.decode())
+		if kind == b':':
+			return int(rest)
+		if kind == b'$':
+			length = int(rest)
+			if length == -1:
+				return None
+			while len(self.buffer) < self.position + length + 2:
+				self._fill()
+			data = bytes(self.buffer[self.position:self.position + length])
+			self.position += length + 2
+			return data.decode('utf-8', 'surrogateescape')
+		if kind == b'*':
+			length = int(rest)
+			if length == -1:
+				return None
+			return [self._read_reply() for _ in range(length)]
+		raise ProtocolError(f"unexpected reply {line!r}")
+
+	def close(self):
+		self.connection.close()
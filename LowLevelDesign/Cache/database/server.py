@@ -0,0 +1,390 @@
+import asyncio
+from contextlib import nullcontext
+from inspect import signature
+
+from database.append_only_file import AppendOnlyFile
+from database.resp import NULL_ARRAY, OK, ProtocolError, RespParser, encode_array, encode_bulk, encode_error, \
+	encode_integer, encode_simple
+from database.transaction import Transaction
+
+
+QUEUED = b'+QUEUED\r\n'
+
+
+class Connection:
+	'''
+		state of one client
+	'''
+	def __init__(self, writer) -> None:
+		self.writer = writer
+		self.transaction = None
+		self.subscription = None
+		self.pusher = None
+
+	def close(self):
+		'''
+			end the subscription, if any
+		'''
+		if self.subscription is not None:
+			self.subscription.close()
+			self.pusher.cancel()
+			self.subscription = None
+			self.pusher = None
+
+
+class Server:
+	'''
+		asyncio TCP server speaking RESP in front of an Interface, so any
+		redis client (redis-cli, redis-benchmark, client libraries) can use it.
+
+		Commands are those of the command line plus redis names for the
+		common ones: put/set, get, delete/del, keys, scan, search, range,
+		revrange, save, ping, replicas (followers to send reads to) and
+		transactions: watch, unwatch, multi, exec, discard. Every connection
+		has its own transaction, its queued commands are run together on
+		exec (one thread, nothing in between). With keyspace notifications
+		subscribe/psubscribe push put and delete events of keys or patterns.
+
+		Pipelining: every read takes whatever the socket has (up to
+		READ_SIZE bytes), runs all complete commands in it and sends all
+		their replies with one write. Everything runs on the event loop
+		thread so commands never run concurrently and need no locks. With
+		an always fsync append only file the records of a read are fsynced
+		together in a worker thread before the replies are sent, the loop
+		keeps serving other clients meanwhile.
+
+		At most max_connections clients are served, more are refused with
+		an error. A client sending nothing for idle_timeout seconds is
+		disconnected.
+	'''
+	READ_SIZE = 64 << 10
+	TRANSACTION_COMMANDS = (b'watch', b'unwatch', b'multi', b'exec', b'discard')
+	SUBSCRIBE_COMMANDS = (b'subscribe', b'psubscribe', b'unsubscribe', b'punsubscribe')
+	TICK_INTERVAL = 0.1
+	SUBSCRIBER_QUEUE = 10_000
+
+	def __init__(self, interface, host='127.0.0.1', port=6380, max_connections=1000, idle_timeout=300) -> None:
+		self.interface = interface
+		self.host = host
+		self.port = port
+		self.max_connections = max_connections
+		self.idle_timeout = idle_timeout
+		self.clients = {}		# handler task: writer of every connected client
+		self.server = None
+		self.handlers = {
+			b'put': self._put, b'set': self._put,
+			b'get': self._get,
+			b'delete': self._delete, b'del': self._delete,
+			b'keys': self._keys,
+			b'search': self._search,
+			b'scan': self._scan,
+			b'range': self._range,
+			b'revrange': self._revrange,
+			b'save': self._save,
+			b'ping': self._ping,
+			b'replicas': self._replicas,
+			b'command': self._command,
+		}
+		self.signatures = {name: signature(handler) for name, handler in self.handlers.items()}
+
+	async def start(self):
+		self.server = await asyncio.start_server(self._serve, self.host, self.port)
+		self.port = self.server.sockets[0].getsockname()[1]		# port 0 picks a free one
+		self.ticker = asyncio.create_task(self._tick())
+		return self.server
+
+	async def serve_forever(self):
+		if self.server is None:
+			await self.start()
+		async with self.server:
+			await self.server.serve_forever()
+
+	async def stop(self):
+		'''
+			stop accepting clients and disconnect the connected ones
+		'''
+		self.ticker.cancel()
+		self.server.close()
+		clients = list(self.clients)
+		for writer in self.clients.values():
+			writer.close()
+		await asyncio.gather(*clients, return_exceptions=True)
+		await self.server.wait_closed()
+
+	async def _tick(self):
+		'''
+			background work of the database (snapshots) while clients are idle
+		'''
+		while True:
+			await asyncio.sleep(self.TICK_INTERVAL)
+			self.interface.store.tick()
+
+	async def _serve(self, reader, writer):
+		if len(self.clients) >= self.max_connections:
+			writer.write(encode_error("max number of clients reached"))
+			writer.close()
+			return
+		task = asyncio.current_task()
+		self.clients[task] = writer
+		parser = RespParser()
+		connection = Connection(writer)
+		try:
+			while True:
+				try:
+					# a subscriber waiting for events is not idle
+					idle_timeout = self.idle_timeout if connection.subscription is None else None
+					data = await asyncio.wait_for(reader.read(self.READ_SIZE), idle_timeout)
+				except asyncio.TimeoutError:
+					break
+				if not data:
+					break
+				try:
+					commands = parser.feed(data)
+				except ProtocolError as error:
+					writer.write(encode_error(f"Protocol error: {error}"))
+					break
+				if not commands:
+					continue
+				append_only_file = self._synced_append_only_file()
+				with nullcontext() if append_only_file is None else append_only_file.deferred_sync():
+					replies = b''.join(self._execute(command, connection) for command in commands)
+				if append_only_file is not None:
+					await asyncio.get_running_loop().run_in_executor(None, append_only_file.sync)
+				writer.write(replies)
+				self.interface.store.tick()
+				await writer.drain()
+		except ConnectionError:
+			pass
+		finally:
+			del self.clients[task]
+			connection.close()
+			writer.close()
+
+	def _synced_append_only_file(self):
+		'''
+			the append only file if every write has to be fsynced before its reply
+		'''
+		append_only_file = self.interface.store.append_only_file
+		if append_only_file is None or append_only_file.fsync_policy != AppendOnlyFile.ALWAYS:
+			return None
+		return append_only_file
+
+	def _execute(self, command, connection):
+		name = command[0].lower()
+		arguments = [self._text(argument) for argument in command[1:]]
+		if name in self.TRANSACTION_COMMANDS:
+			return self._transaction_command(name, arguments, connection)
+		if name in self.SUBSCRIBE_COMMANDS:
+			return self._subscribe_command(name, arguments, connection)
+		handler = self.handlers.get(name)
+		if handler is None:
+			return encode_error(f"unknown command '{command[0].decode(errors='replace')}'")
+		try:
+			self.signatures[name].bind(*arguments)
+		except TypeError:
+			return self._arity_error(name)
+		if connection.transaction is not None and connection.transaction.started:
+			connection.transaction.queue(self._call, handler, arguments)
+			return QUEUED
+		return self._call(handler, arguments)
+
+	@staticmethod
+	def _call(handler, arguments):
+		'''
+			run a command, any error is the client's reply and keeps the connection
+		'''
+		try:
+			return handler(*arguments)
+		except Exception as error:
+			return encode_error(str(error))
+
+	@staticmethod
+	def _arity_error(name):
+		return encode_error(f"wrong number of arguments for '{name.decode(errors='replace')}' command")
+
+	def _transaction_command(self, name, arguments, connection):
+		transaction = connection.transaction
+		try:
+			if name == b'watch':
+				if not arguments:
+					raise RuntimeError("wrong number of arguments for 'watch' command")
+				if transaction is None:
+					transaction = connection.transaction = Transaction(self.interface)
+				transaction.watch(*arguments)
+			elif name == b'unwatch':
+				if transaction is not None and not transaction.started:
+					connection.transaction = None
+			elif name == b'multi':
+				if transaction is None:
+					transaction = connection.transaction = Transaction(self.interface)
+				transaction.multi()
+			elif name == b'discard':
+				if transaction is None or not transaction.started:
+					raise RuntimeError("discard without multi")
+				connection.transaction = None
+			else:
+				if transaction is None or not transaction.started:
+					raise RuntimeError("exec without multi")
+				connection.transaction = None
+				replies = transaction.execute()
+				if replies is None:
+					return NULL_ARRAY
+				return b'*%d\r\n' % len(replies) + b''.join(replies)
+		except RuntimeError as error:
+			return encode_error(str(error))
+		return OK
+
+	def _subscribe_command(self, name, arguments, connection):
+		'''
+			subscribe key..., psubscribe pattern... and their unsubscribe
+			events are pushed as [message, key, event] or [pmessage, pattern, key, event]
+			once nothing is subscribed the connection is a normal one again
+		'''
+		notifier = self.interface.store.notifier
+		if notifier is None:
+			return encode_error("keyspace notifications are off, start with --notifications")
+		if name in (b'subscribe', b'psubscribe') and not arguments:
+			return self._arity_error(name)
+		unsubscribing = name in (b'unsubscribe', b'punsubscribe')
+		if connection.subscription is None:
+			if unsubscribing:
+				return self._subscribe_reply(name, arguments or [None], 0)
+			ready = asyncio.Event()
+			loop = asyncio.get_running_loop()
+			connection.subscription = notifier.subscription(self.SUBSCRIBER_QUEUE,
+				on_event=lambda: loop.call_soon_threadsafe(ready.set))
+			connection.pusher = asyncio.create_task(self._push_events(connection, ready))
+		subscription = connection.subscription
+		method = getattr(subscription, name.decode())
+		targets = arguments
+		if not targets:
+			# bare unsubscribe drops everything, one reply per key or pattern
+			targets = sorted(subscription.keys if name == b'unsubscribe' else subscription.patterns, key=str)
+		replies = []
+		for target in targets:
+			method(target)
+			count = len(subscription.keys) + len(subscription.patterns)
+			replies.append(self._subscribe_reply(name, [target], count))
+		if not targets:
+			count = len(subscription.keys) + len(subscription.patterns)
+			replies.append(self._subscribe_reply(name, [None], count))
+		if unsubscribing and not count:
+			connection.close()
+		return b''.join(replies)
+
+	def _subscribe_reply(self, name, targets, count):
+		'''
+			[name, key or pattern, number of subscriptions left] for every target
+		'''
+		return b''.join(b'*3\r\n' + encode_bulk(name) + encode_bulk(None if target is None else self._data(target))
+			+ encode_integer(count) for target in targets)
+
+	async def _push_events(self, connection, ready):
+		subscription = connection.subscription
+		writer = connection.writer
+		try:
+			while True:
+				await ready.wait()
+				ready.clear()
+				messages = []
+				for kind, key, pattern in subscription.drain():
+					if pattern is None:
+						messages.append(encode_array([b'message', self._data(key), kind.encode()]))
+					else:
+						messages.append(encode_array([b'pmessage', self._data(pattern), self._data(key), kind.encode()]))
+				writer.write(b''.join(messages))
+				await writer.drain()
+		except ConnectionError:
+			pass		# the client is gone, _serve closes the connection
+
+	@staticmethod
+	def _text(data):
+		# the command line stores str, so does the server
+		return data.decode('utf-8', 'surrogateescape')
+
+	@staticmethod
+	def _data(value):
+		if isinstance(value, str):
+			return value.encode('utf-8', 'surrogateescape')
+		return str(value).encode()
+
+	def _put(self, key, value):
+		self.interface.put(key, value)
+		return OK
+
+	def _get(self, key):
+		value = self.interface.get(key)
+		return encode_bulk(None if value is None else self._data(value))
+
+	def _delete(self, *keys):
+		if not keys:
+			return self._arity_error(b'del')
+		deleted = 0
+		for key in keys:
+			if key in self.interface.database:
+				self.interface.delete(key)
+				deleted += 1
+		return encode_integer(deleted)
+
+	def _keys(self, *_):
+		# redis clients send a pattern, it is ignored
+		return encode_array([self._data(key) for key in self.interface.keys()])
+
+	def _search(self, value):
+		return encode_array([self._data(key) for key in self.interface.search(value)])
+
+	def _scan(self, cursor, *options):
+		'''
+			scan cursor [MATCH pattern] [COUNT count], reply is [next cursor, [keys]]
+		'''
+		match = None
+		count = self.interface.SCAN_COUNT
+		if len(options) % 2:
+			return encode_error("syntax error")
+		try:
+			cursor = int(cursor)
+			for name, value in zip(options[::2], options[1::2]):
+				if name.lower() == 'match':
+					match = value
+				elif name.lower() == 'count':
+					count = int(value)
+				else:
+					return encode_error("syntax error")
+			cursor, keys = self.interface.scan(cursor, count, match)
+		except ValueError as error:
+			return encode_error(str(error))
+		return b'*2\r\n' + encode_bulk(b'%d' % cursor) + encode_array([self._data(key) for key in keys])
+
+	def _range(self, start, end, limit=None):
+		return self._key_range(start, end, limit, False)
+
+	def _revrange(self, start, end, limit=None):
+		return self._key_range(start, end, limit, True)
+
+	def _key_range(self, start, end, limit, reverse):
+		start, end = (None if bound in self.interface.UNBOUNDED else bound for bound in (start, end))
+		try:
+			limit = None if limit is None else int(limit)
+		except ValueError:
+			return encode_error("limit is not an integer")
+		if limit is not None and limit < 0:
+			return encode_error("limit is negative")
+		return encode_array([self._data(key) for key in self.interface.range(start, end, limit, reverse)])
+
+	def _save(self):
+		return encode_simple(self.interface.save())
+
+	def _replicas(self):
+		'''
+			addresses of the followers serving reads, empty unless this is a leader
+		'''
+		replication_log = self.interface.store.replication_log
+		addresses = [] if replication_log is None else replication_log.follower_addresses()
+		return encode_array([self._data(address) for address in addresses])
+
+	def _ping(self, message=None):
+		return encode_simple('PONG') if message is None else encode_bulk(self._data(message))
+
+	def _command(self, *_):
+		# redis-cli asks for command docs when it starts
+		return encode_array([])
@@ -0,0 +1,212 @@
+'''
+	Point in time snapshots of the database.
+
+	file: magic (8) | version (4) | entries | end marker | crc32 (4)
+	entry: key length (4) | value length (4) | key | value
+	end marker: key length 0 | number of entries (4)
+
+	Keys and values are encoded with database.codec, an encoded key is never
+	empty so length 0 marks the end. The crc32 covers every byte before it.
+	A snapshot is written to path + '.tmp' and renamed over path when complete,
+	so path always holds the last complete snapshot.
+'''
+import os
+import struct
+import traceback
+import zlib
+
+from database.codec import decode, encode
+from database.database_listener import DatabaseListener
+from database.exceptions.corrupted_snapshot_exception import CorruptedSnapshotException
+
+MAGIC = b'LLDSNAP1'
+VERSION = 1
+HEADER = struct.Struct('<8sI')
+ENTRY = struct.Struct('<II')
+CRC = struct.Struct('<I')
+CHUNK = 1 << 20
+
+
+class SnapshotWriter:
+	'''
+		writes entries to a temporary file in large chunks, commit renames it over path
+	'''
+	def __init__(self, path) -> None:
+		self.path = path
+		self.temporary_path = path + '.tmp'
+		self.file = open(self.temporary_path, 'wb')
+		self.buffer = bytearray(HEADER.pack(MAGIC, VERSION))
+		self.crc = 0
+		self.count = 0
+
+	def add(self, key, value):
+		key_data = encode(key)
+		value_data = encode(value)
+		self.buffer += ENTRY.pack(len(key_data), len(value_data))
+		self.buffer += key_data
+		self.buffer += value_data
+		self.count += 1
+		if len(self.buffer) >= CHUNK:
+			self._write_buffer()
+
+	def _write_buffer(self):
+		self.crc = zlib.crc32(self.buffer, self.crc)
+		self.file.write(self.buffer)
+		self.buffer = bytearray()
+
+	def commit(self):
+		self.buffer += ENTRY.pack(0, self.count)
+		self._write_buffer()
+		self.file.write(CRC.pack(self.crc))
+		self.file.flush()
+		os.fsync(self.file.fileno())
+		self.file.close()
+		os.replace(self.temporary_path, self.path)
+		return self.count
+
+	def abort(self):
+		self.file.close()
+		if os.path.exists(self.temporary_path):
+			os.remove(self.temporary_path)
+
+
+def write_snapshot(path, items):
+	'''
+		write every (key, value) of items, return the number of entries
+	'''
+	writer = SnapshotWriter(path)
+	try:
+		for key, value in items:
+			writer.add(key, value)
+		return writer.commit()
+	except BaseException:
+		writer.abort()
+		raise
+
+
+def fork_snapshot(path, storage):
+	'''
+		write storage from a forked child and return its pid, the parent goes
+		on serving at once. The child sees the dict as it was at fork time,
+		pages are only copied when the parent writes to them. A child which
+		fails prints its traceback and exits with status 1.
+	'''
+	pid = os.fork()
+	if pid != 0:
+		return pid
+	status = 1
+	try:
+		write_snapshot(path, storage.items())
+		status = 0
+	except BaseException:
+		traceback.print_exc()
+	finally:
+		os._exit(status)
+
+
+class IncrementalSnapshot(DatabaseListener):
+	'''
+		Snapshot written a few entries at a time by step() between commands.
+
+		The keys are listed when it starts. A listed key which is changed or
+		deleted before it was written has its old value saved first, so the
+		file holds the data as it was at the start. Keys added later are not
+		part of the snapshot.
+	'''
+	def __init__(self, path, storage) -> None:
+		self.storage = storage
+		self.keys = list(storage)
+		self.pending = set(self.keys)
+		self.position = 0
+		self.saved = {}
+		self.writer = SnapshotWriter(path)
+		self.done = False
+
+	def step(self, count):
+		'''
+			write up to count entries, commit when all are written
+			return True when the snapshot is complete
+		'''
+		end = min(self.position + count, len(self.keys))
+		for key in self.keys[self.position:end]:
+			self.pending.discard(key)
+			if key in self.saved:
+				self.writer.add(key, self.saved.pop(key))
+			else:
+				self.writer.add(key, self.storage[key])
+		self.position = end
+		if end == len(self.keys):
+			self.writer.commit()
+			self.done = True
+		return self.done
+
+	def _save(self, key, old_value):
+		# only the first change of a key not written yet needs its old value
+		if key in self.pending and key not in self.saved:
+			self.saved[key] = old_value
+
+	def on_put(self, key, value, old_value, existed):
+		if existed:
+			self._save(key, old_value)
+
+	def on_delete(self, key, old_value):
+		self._save(key, old_value)
+
+	def close(self):
+		'''
+			write the remaining entries
+		'''
+		if not self.done:
+			self.step(len(self.keys))
+
+
+def load_snapshot(path):
+	'''
+		read the snapshot at path in chunks and return it as a dict
+		raise CorruptedSnapshotException if it is incomplete or its crc doesn't match
+		entries are kept encoded until the crc is checked, damaged bytes are
+		never decoded
+	'''
+	entries = []		# (encoded key, encoded value)
+	file_size = os.path.getsize(path)
+	with open(path, 'rb') as snapshot:
+		data = snapshot.read(CHUNK)
+		if len(data) < HEADER.size or HEADER.unpack_from(data)[0] != MAGIC:
+			raise CorruptedSnapshotException(f"{path} is not a snapshot")
+		if HEADER.unpack_from(data)[1] != VERSION:
+			raise CorruptedSnapshotException(f"{path} is not a version {VERSION} snapshot")
+		crc = 0
+		offset = 0		# position of data in the file
+		position = HEADER.size
+		needed = ENTRY.size
+		while True:
+			if position + needed > len(data):
+				if offset + position + needed > file_size:
+					# a damaged length points past the end as well
+					raise CorruptedSnapshotException(f"{path} is truncated")
+				# keep the unread tail and read on, crc covers what was parsed
+				chunk = snapshot.read(max(CHUNK, needed))
+				crc = zlib.crc32(memoryview(data)[:position], crc)
+				offset += position
+				data = data[position:] + chunk
+				position = 0
+				continue
+			key_length, value_length = ENTRY.unpack_from(data, position)
+			if key_length == 0:
+				needed = ENTRY.size + CRC.size
+				if position + needed > len(data):
+					continue
+				end = position + ENTRY.size
+				if CRC.unpack_from(data, end)[0] != zlib.crc32(memoryview(data)[:end], crc):
+					raise CorruptedSnapshotException(f"{path} checksum mismatch")
+				if value_length != len(entries):
+					raise CorruptedSnapshotException(f"{path} has {len(entries)} entries, expected {value_length}")
+				return {decode(key): decode(value) for key, value in entries}
+			needed = ENTRY.size + key_length + value_length
+			if position + needed > len(data):
+				continue
+			key_start = position + ENTRY.size
+			value_start = key_start + key_length
+			position += needed
+			entries.append((data[key_start:value_start], data[value_start:position]))
+			needed = ENTRY.size
@@ -0,0 +1,60 @@
+class Transaction:
+	'''
+		Optimistic transaction of one client.
+
+		watch(key) remembers the version of the key. After multi() commands
+		are queued instead of run, execute() runs them all at once if no
+		watched key was written since it was watched, else it runs nothing
+		and returns None. Nothing is locked so conflicting clients never
+		wait, the loser retries.
+
+		Queued commands run back to back without other commands in between
+		as long as the database is used from one thread (command line, server).
+		Their changes reach the append only file as one record.
+	'''
+	def __init__(self, interface) -> None:
+		self.interface = interface
+		self.versions = interface.store.versions
+		self.watched = {}
+		self.commands = []
+		self.started = False
+
+	def watch(self, *keys):
+		if self.started:
+			raise RuntimeError("watch inside multi is not allowed")
+		for key in keys:
+			self.watched.setdefault(key, self.versions.version(key))
+
+	def multi(self):
+		if self.started:
+			raise RuntimeError("multi calls can not be nested")
+		self.started = True
+
+	def queue(self, function, *args):
+		if not self.started:
+			raise RuntimeError("queue without multi")
+		self.commands.append((function, args))
+
+	def put(self, key, value):
+		self.queue(self.interface.put, key, value)
+
+	def get(self, key):
+		self.queue(self.interface.get, key)
+
+	def delete(self, key):
+		self.queue(self.interface.delete, key)
+
+	def is_conflicting(self):
+		version = self.versions.version
+		return any(version(key) != watched for key, watched in self.watched.items())
+
+	def execute(self):
+		'''
+			results of the queued commands, None if a watched key changed
+		'''
+		if not self.started:
+			raise RuntimeError("exec without multi")
+		if self.is_conflicting():
+			return None
+		with self.interface.store.batch():
+			return [function(*args) for function, args in self.commands]
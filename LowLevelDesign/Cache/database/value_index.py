@@ -0,0 +1,79 @@
+import sys
+
+from database.database_listener import DatabaseListener
+
+
+class ValueIndex(DatabaseListener):
+	'''
+		Inverted index from value to the set of keys holding it, so search
+		is a dict lookup instead of a scan of the database.
+
+		It is kept up to date from put and delete: an overwrite moves the key
+		from the set of its old value to the one of its new value, a set left
+		empty is dropped. Keys whose value is unhashable (a list, a dict) can't
+		be indexed, they are kept apart and compared one by one on search.
+	'''
+	def __init__(self, storage) -> None:
+		self.storage = storage
+		self.index = {}
+		self.unhashable = set()
+		for key, value in storage.items():
+			self._add(key, value)
+
+	def _add(self, key, value):
+		try:
+			keys = self.index.get(value)
+		except TypeError:
+			self.unhashable.add(key)
+			return
+		if keys is None:
+			self.index[value] = keys = set()
+		keys.add(key)
+
+	def _remove(self, key, value):
+		try:
+			keys = self.index.get(value)
+		except TypeError:
+			self.unhashable.discard(key)
+			return
+		if keys is not None:
+			keys.discard(key)
+			if not keys:
+				del self.index[value]
+
+	def on_put(self, key, value, old_value, existed):
+		if existed:
+			self._remove(key, old_value)
+		self._add(key, value)
+
+	def on_delete(self, key, old_value):
+		self._remove(key, old_value)
+
+	def search(self, value):
+		'''
+			keys whose value equals value
+		'''
+		try:
+			keys = list(self.index.get(value, ()))
+		except TypeError:
+			keys = []
+		storage = self.storage
+		keys.extend(key for key in self.unhashable if storage[key] == value)
+		return keys
+
+	def memory_usage(self):
+		'''
+			bytes used by the index itself, keys and values are shared with
+			the database and not counted
+		'''
+		size = sys.getsizeof(self.index) + sys.getsizeof(self.unhashable)
+		for keys in self.index.values():
+			size += sys.getsizeof(keys)
+		return size
+
+	def stats(self):
+		return {
+			'values': len(self.index),
+			'unhashable_keys': len(self.unhashable),
+			'bytes': self.memory_usage(),
+		}
@@ -1,6 +1,203 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+from contextlib import nullcontext
+
+from database.append_only_file import AppendOnlyFile
+from database.exceptions.read_only_exception import ReadOnlyException
+from database.key_slots import KeySlots
+from database.key_versions import KeyVersions
+from database.notifications import KeyspaceNotifier
+from database.ordered_key_index import OrderedKeyIndex, prefix_end
+from database.replication import Follower, ReplicationLog, parse_address
+from database.server import Server
+from database.snapshot import IncrementalSnapshot, fork_snapshot, load_snapshot
+from database.transaction import Transaction
+from database.value_index import ValueIndex
+
+
 class Database:
-	def __init__(self) -> None:
+	SNAPSHOT_STEP = 1000
+
+	def __init__(self, append_only_file: AppendOnlyFile = None, snapshot_path=None, snapshot_interval=None,
+		clock=time.monotonic, value_index=False, ordered_keys=False, notifications=False) -> None:
+		'''
+			append_only_file is replayed into storage and then logs every change
+			without it the snapshot at snapshot_path is loaded if there is one
+			snapshot_interval is the number of seconds between snapshots taken by tick
+			value_index keeps an index from value to keys for search, it costs
+			memory and time on every write
+			ordered_keys keeps string keys sorted for prefix and range scans
+			notifications publishes put and delete events to subscribers
+		'''
 		self.storage = {}
+		self.listeners = []
+		self.append_only_file = append_only_file
+		self.snapshot_path = snapshot_path
+		self.snapshot_interval = snapshot_interval
+		self.clock = clock
+		self.last_snapshot = clock()
+		self.snapshot_pid = None
+		self.snapshot_error = None		# why the last forked snapshot failed, None if it didn't
+		self.incremental_snapshot = None
+		if append_only_file is not None:
+			append_only_file.replay_into(self.storage)
+			self.add_listener(append_only_file)
+		elif snapshot_path is not None and os.path.exists(snapshot_path):
+			self.storage = load_snapshot(snapshot_path)
+		self.value_index = None
+		if value_index:
+			self.value_index = ValueIndex(self.storage)
+			self.add_listener(self.value_index)
+		self.key_index = None
+		if ordered_keys:
+			self.key_index = OrderedKeyIndex(self.storage)
+			self.add_listener(self.key_index)
+		self.key_slots = None
+		self.versions = KeyVersions()
+		self.add_listener(self.versions)
+		self.replication_log = None
+		self.follower = None
+		self.notifier = None
+		if notifications:
+			self.notifier = KeyspaceNotifier()
+			self.add_listener(self.notifier)
+
+	def add_listener(self, listener):
+		self.listeners.append(listener)
+
+	def remove_listener(self, listener):
+		self.listeners.remove(listener)
+
+	def put(self, key, value):
+		if self.follower is not None:
+			raise ReadOnlyException("this database is a follower, write to the leader")
+		self.apply_put(key, value)
+
+	def delete(self, key):
+		if self.follower is not None:
+			raise ReadOnlyException("this database is a follower, write to the leader")
+		self.apply_delete(key)
+
+	def apply_put(self, key, value):
+		'''
+			put without the follower check, replication applies the leader's changes with it
+		'''
+		existed = key in self.storage
+		old_value = self.storage.get(key)
+		self.storage[key] = value
+		for listener in self.listeners:
+			listener.on_put(key, value, old_value, existed)
+
+	def apply_delete(self, key):
+		if key not in self.storage:
+			return
+		old_value = self.storage.pop(key)
+		for listener in self.listeners:
+			listener.on_delete(key, old_value)
+
+	def start_replication(self, address, backlog_size=ReplicationLog.BACKLOG_SIZE):
+		'''
+			become a leader, followers connect to address ((host, port) or unix socket path)
+		'''
+		self.replication_log = ReplicationLog(self, address, backlog_size)
+		self.add_listener(self.replication_log)
+		return self.replication_log
+
+	def replicate_from(self, address, announce=None):
+		'''
+			become a read only follower of the leader at address
+			announce is where this follower serves reads, the leader lists it for clients
+		'''
+		self.follower = Follower(self, address, announce)
+		return self.follower
+
+	def scannable_keys(self):
+		'''
+			KeySlots for scan, built on first use so databases never scanned don't pay for it
+		'''
+		if self.key_slots is None:
+			self.key_slots = KeySlots(self.storage)
+			self.add_listener(self.key_slots)
+		return self.key_slots
+
+	def rewrite_append_only_file(self):
+		'''
+			compact the log in the background from a copy of the data
+		'''
+		return self.append_only_file.rewrite(dict(self.storage))
+
+	def batch(self):
+		'''
+			changes made inside the returned context are logged to the append
+			only file as one record, so after a crash all of them or none are there
+		'''
+		if self.append_only_file is None:
+			return nullcontext()
+		return self.append_only_file.batch()
+
+	def save_snapshot(self, incremental=not hasattr(os, 'fork')):
+		'''
+			start writing a snapshot to snapshot_path, return False if one is running
+			by default a forked child writes it, an incremental snapshot is
+			written by tick a few entries at a time
+		'''
+		if self.snapshot_pid is not None or self.incremental_snapshot is not None:
+			return False
+		self.last_snapshot = self.clock()
+		if incremental:
+			self.incremental_snapshot = IncrementalSnapshot(self.snapshot_path, self.storage)
+			self.add_listener(self.incremental_snapshot)
+		else:
+			self.snapshot_pid = fork_snapshot(self.snapshot_path, self.storage)
+		return True
+
+	def tick(self):
+		'''
+			background work, called between commands
+			applies replicated changes, serves full syncs to followers,
+			starts periodic snapshots and moves the running one forward
+		'''
+		if self.follower is not None:
+			self.follower.tick()
+		if self.replication_log is not None:
+			self.replication_log.tick()
+		if self.snapshot_pid is not None:
+			pid, status = os.waitpid(self.snapshot_pid, os.WNOHANG)
+			if pid != 0:
+				self._snapshot_finished(status)
+		elif self.incremental_snapshot is not None:
+			if self.incremental_snapshot.step(self.SNAPSHOT_STEP):
+				self.remove_listener(self.incremental_snapshot)
+				self.incremental_snapshot = None
+		elif self.snapshot_interval is not None and self.clock() - self.last_snapshot >= self.snapshot_interval:
+			self.save_snapshot()
+
+	def _snapshot_finished(self, status):
+		'''
+			reap the snapshot child, a failure is kept in snapshot_error and reported
+		'''
+		self.snapshot_pid = None
+		exit_code = os.waitstatus_to_exitcode(status)
+		if exit_code == 0:
+			self.snapshot_error = None
+			return
+		self.snapshot_error = f"snapshot to {self.snapshot_path} failed with exit code {exit_code}"
+		print(self.snapshot_error, file=sys.stderr)
+
+	def close(self):
+		'''
+			finish a running snapshot and close the listeners
+		'''
+		if self.snapshot_pid is not None:
+			self._snapshot_finished(os.waitpid(self.snapshot_pid, 0)[1])
+		if self.follower is not None:
+			self.follower.close()
+		for listener in self.listeners:
+			listener.close()
+		self.incremental_snapshot = None
 
 
 class Interface:
@@ -9,10 +206,30 @@ class Interface:
 	DELETE = 'delete'
 	KEYS = 'keys'
 	SEARCH = 'search'
+	SAVE = 'save'
+	RANGE = 'range'
+	REVRANGE = 'revrange'
+	SCAN = 'scan'
+	MULTI = 'multi'
+	EXEC = 'exec'
+	DISCARD = 'discard'
+	WATCH = 'watch'
+	UNWATCH = 'unwatch'
+	COMMANDS = [PUT, GET, DELETE, SEARCH, KEYS, SAVE, RANGE, REVRANGE, SCAN]
+	TRANSACTION_COMMANDS = [MULTI, EXEC, DISCARD, WATCH, UNWATCH]
+	UNBOUNDED = ('-', '+')
+	SCAN_COUNT = 10
+	# command -> (least, most) arguments, and the indexes of integer arguments
+	ARGUMENTS = {
+		PUT: (2, 2, ()), GET: (1, 1, ()), DELETE: (1, 1, ()), KEYS: (0, 1, ()), SEARCH: (1, 1, ()),
+		SAVE: (0, 0, ()), RANGE: (2, 3, (2,)), REVRANGE: (2, 3, (2,)), SCAN: (0, 3, (0, 1)),
+	}
 
 	def __init__(self, database) -> None:
-		# attach interface to database
+		# attach interface to database, reads go to storage, writes through database
+		self.store = database
 		self.database = database.storage
+		self.transaction = None
 
 	def run(self):
 		while True:
@@ -20,27 +237,88 @@ class Interface:
 			if command == 'exit':
 				break
 			command = command.split()  # split on spaces
-			if len(command) < 1 or command[0] not in [self.PUT, self.GET, self.DELETE, self.SEARCH, self.KEYS]:
+			if len(command) < 1 or command[0] not in self.COMMANDS + self.TRANSACTION_COMMANDS:
 				print("Improper Command")
 				continue
 			method = command[0]
 			data = command[1:]
-			if self.PUT == method:
-				key = data[0]
-				value = data[1]
-				self.put(key, value)
-			elif self.GET == method:
-				key = data[0]
-				print(self.get(key))
-			elif self.DELETE == method:
-				key = data[0]
-				self.delete(key)
-			elif self.KEYS == method:
-				print(self.keys())
-			elif self.SEARCH == method:
-				value = data[0]
-				print(self.search(value))
+			try:
+				if method in self.ARGUMENTS:
+					self.check_arguments(method, data)
+				if method in self.TRANSACTION_COMMANDS:
+					self.transaction_command(method, data)
+				elif self.transaction is not None and self.transaction.started:
+					self.transaction.queue(self.execute, method, data)
+					print("QUEUED")
+				else:
+					result = self.execute(method, data)
+					if method not in (self.PUT, self.DELETE):
+						print(result)
+			except (RuntimeError, ReadOnlyException, ValueError) as error:
+				print(error)
+			self.store.tick()
+
+	def check_arguments(self, method, data):
+		'''
+			raise ValueError if data are not valid arguments of method, checked
+			before a command runs or is queued so a bad one never runs half way
+		'''
+		least, most, integers = self.ARGUMENTS[method]
+		if not least <= len(data) <= most:
+			raise ValueError(f"wrong number of arguments for '{method}' command")
+		for index in integers:
+			if index < len(data):
+				try:
+					value = int(data[index])
+				except ValueError:
+					raise ValueError(f"{data[index]} is not an integer") from None
+				if value < 0:
+					raise ValueError(f"{data[index]} is negative")
 
+	def execute(self, method, data):
+		'''
+			run one command line command and return its result
+		'''
+		if self.PUT == method:
+			key = data[0]
+			value = data[1]
+			return self.put(key, value)
+		elif self.GET == method:
+			key = data[0]
+			return self.get(key)
+		elif self.DELETE == method:
+			key = data[0]
+			return self.delete(key)
+		elif self.KEYS == method:
+			return self.keys(*data[:1])
+		elif self.SEARCH == method:
+			value = data[0]
+			return self.search(value)
+		elif self.SAVE == method:
+			return self.save()
+		elif method in (self.RANGE, self.REVRANGE):
+			# range start end [limit], '-' and '+' leave start and end open
+			start, end = (None if bound in self.UNBOUNDED else bound for bound in data[:2])
+			limit = int(data[2]) if len(data) > 2 else None
+			return self.range(start, end, limit, reverse=self.REVRANGE == method)
+		elif self.SCAN == method:
+			# scan cursor [count] [match]
+			cursor = int(data[0]) if data else 0
+			count = int(data[1]) if len(data) > 1 else self.SCAN_COUNT
+			return self.scan(cursor, count, *data[2:3])
+
+	def transaction_command(self, method, data):
+		if self.WATCH == method:
+			self.watch(*data)
+		elif self.UNWATCH == method:
+			self.unwatch()
+		elif self.MULTI == method:
+			self.multi()
+		elif self.DISCARD == method:
+			self.discard()
+		elif self.EXEC == method:
+			results = self.exec()
+			print("Aborted, a watched key changed" if results is None else results)
 
 	def get(self, key: str):
 		'''
@@ -54,30 +332,139 @@ class Interface:
 			Put a value against a key in the cache
 			Create the entry if not present else update
 		'''
-		self.database[key] = value
+		self.store.put(key, value)
 
 	def delete(self, key):
 		'''
 			Remove a key if present
 		'''
-		if key in self.database:
-			del self.database[key]
+		self.store.delete(key)
 
-	def keys(self):
+	def watch(self, *keys):
+		'''
+			Abort the next transaction if any of keys is written before it executes
+		'''
+		if self.transaction is None:
+			self.transaction = Transaction(self)
+		self.transaction.watch(*keys)
+
+	def unwatch(self):
+		if self.transaction is not None and not self.transaction.started:
+			self.transaction = None
+
+	def multi(self):
+		'''
+			Start a transaction, returns it to queue commands with put/get/delete
+		'''
+		if self.transaction is None:
+			self.transaction = Transaction(self)
+		self.transaction.multi()
+		return self.transaction
+
+	def exec(self):
+		'''
+			Run the queued commands together, return their results
+			or None when a watched key changed and nothing was run
+		'''
+		if self.transaction is None or not self.transaction.started:
+			raise RuntimeError("exec without multi")
+		transaction = self.transaction
+		self.transaction = None
+		return transaction.execute()
+
+	def discard(self):
+		'''
+			Drop the queued commands and the watched keys
+		'''
+		if self.transaction is None or not self.transaction.started:
+			raise RuntimeError("discard without multi")
+		self.transaction = None
+
+	def save(self):
+		'''
+			Start a snapshot in the background, commands keep being served
+		'''
+		if self.store.snapshot_path is None:
+			return "No snapshot path"
+		error = self.store.snapshot_error
+		if self.store.save_snapshot():
+			return "Snapshot started" if error is None else f"Snapshot started, the last one failed: {error}"
+		return "Snapshot already running"
+
+	def keys(self, prefix=None):
 		'''
 			Get all the keys in database
+			with prefix only the string keys starting with it, sorted
+		'''
+		if prefix is None:
+			return list(self.database.keys())
+		return self.range(prefix, prefix_end(prefix))
+
+	def scan(self, cursor=0, count=SCAN_COUNT, match=None):
+		'''
+			Return the next cursor and a batch of keys, start with cursor 0 and
+			call again with the returned cursor until it is 0. Every key present
+			during the whole scan is returned once, each call looks at count slots.
+			match is a glob pattern like user:*
+		'''
+		if cursor < 0 or count <= 0:
+			raise ValueError("cursor should be >= 0 and count > 0")
+		return self.store.scannable_keys().scan(cursor, count, match)
+
+	def range(self, start=None, end=None, limit=None, reverse=False):
+		'''
+			Sorted string keys from start (included) to end (excluded), at most limit
+			Uses the ordered key index if there is one else sorts the keys
 		'''
-		return list(self.database.keys())
+		if self.store.key_index is not None:
+			return self.store.key_index.range(start, end, limit, reverse)
+		keys = sorted(k for k in self.database if type(k) is str and (start is None or k >= start)
+			and (end is None or k < end))
+		if reverse:
+			keys.reverse()
+		return keys[:limit]
 
 	def search(self, value):
 		'''
 			Search and return the key which have given value else return nothing
 		'''
+		if self.store.value_index is not None:
+			return self.store.value_index.search(value)
 		return [k for k,v in self.database.items() if v == value]
 
 
 if __name__ == "__main__":
 	# provide 'exit' as input to stop the program
-	database = Database()
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--aof', help="append only file to load from and log changes to")
+	parser.add_argument('--fsync', default=AppendOnlyFile.EVERYSEC,
+		choices=[AppendOnlyFile.ALWAYS, AppendOnlyFile.EVERYSEC, AppendOnlyFile.NO])
+	parser.add_argument('--snapshot', help="snapshot file to load from (without --aof) and save to")
+	parser.add_argument('--snapshot-interval', type=float, help="seconds between automatic snapshots")
+	parser.add_argument('--value-index', action='store_true', help="index values so search doesn't scan")
+	parser.add_argument('--ordered-keys', action='store_true', help="keep keys sorted for prefix and range scans")
+	parser.add_argument('--notifications', action='store_true', help="publish keyspace events to subscribers")
+	parser.add_argument('--replication', help="accept followers on host:port or a unix socket path")
+	parser.add_argument('--replica-of', help="follow the leader at host:port or a unix socket path")
+	parser.add_argument('--port', type=int, help="serve RESP clients on this port instead of reading commands")
+	parser.add_argument('--host', default='127.0.0.1')
+	parser.add_argument('--max-connections', type=int, default=1000)
+	parser.add_argument('--idle-timeout', type=float, default=300, help="seconds before an idle client is disconnected")
+	arguments = parser.parse_args()
+	append_only_file = AppendOnlyFile(arguments.aof, arguments.fsync) if arguments.aof else None
+	database = Database(append_only_file, arguments.snapshot, arguments.snapshot_interval,
+		value_index=arguments.value_index, ordered_keys=arguments.ordered_keys, notifications=arguments.notifications)
+	if arguments.replication:
+		database.start_replication(parse_address(arguments.replication))
+	if arguments.replica_of:
+		announce = f'{arguments.host}:{arguments.port}' if arguments.port is not None else None
+		database.replicate_from(parse_address(arguments.replica_of), announce)
 	interface = Interface(database)
-	interface.run()
+	try:
+		if arguments.port is None:
+			interface.run()
+		else:
+			server = Server(interface, arguments.host, arguments.port, arguments.max_connections, arguments.idle_timeout)
+			asyncio.run(server.serve_forever())
+	finally:
+		database.close()
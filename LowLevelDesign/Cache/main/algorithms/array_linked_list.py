@@ -0,0 +1,150 @@
+from array import array
+
+from algorithms.exceptions.invalid_element_exception import InvalidElementException
+from algorithms.exceptions.invalid_node_exception import InvalidNodeException
+
+
+class ArrayLinkedList:
+	"""
+		Doubly linked list whose links are kept in preallocated integer arrays.
+		A node is just a slot id (an int) instead of a python object, so the
+		list creates no per element garbage collected objects.
+
+		Slot 0 is the sentinel: next_links[0] is the first node and
+		prev_links[0] is the last node. Free slots are chained through
+		next_links starting at free_head and are reused before the arrays grow.
+	"""
+	NO_SLOT = -1
+
+	def __init__(self, capacity=16) -> None:
+		"""
+			preallocate links for capacity nodes, all of them free
+		"""
+		self.next_links = array('l', [0])
+		self.prev_links = array('l', [0])
+		self.elements = [None]
+		self.free_head = self.NO_SLOT
+		self.size = 0
+		self._grow(max(capacity, 1))
+
+	def _grow(self, count):
+		"""
+			append count free slots to the arrays and chain them on the free list
+		"""
+		start = len(self.next_links)
+		end = start + count
+		free_chain = array('l', range(start + 1, end + 1))
+		free_chain[-1] = self.free_head
+		self.next_links.extend(free_chain)
+		self.prev_links.extend(array('l', [0]) * count)
+		self.elements.extend([None] * count)
+		self.free_head = start
+
+	def _allocate_slot(self):
+		"""
+			pop a slot from the free list, doubling the arrays if none is left
+		"""
+		if self.free_head == self.NO_SLOT:
+			self._grow(len(self.next_links) - 1)
+		slot = self.free_head
+		self.free_head = self.next_links[slot]
+		return slot
+
+	def _validate(self, slot):
+		if slot is None or slot <= 0 or slot >= len(self.next_links):
+			raise InvalidNodeException(f"Slot is : {slot}")
+
+	def detach_node(self, slot):
+		"""
+			detach the given slot from linked list, the slot stays allocated
+		"""
+		self._validate(slot)
+		next_links = self.next_links
+		prev_links = self.prev_links
+		next_slot = next_links[slot]
+		prev_slot = prev_links[slot]
+		next_links[prev_slot] = next_slot
+		prev_links[next_slot] = prev_slot
+		self.size -= 1
+
+	def add_node_at_last(self, slot):
+		"""
+			Add the detached slot passed to the end of linked list
+		"""
+		self._validate(slot)
+		prev_links = self.prev_links
+		last = prev_links[0]
+		self.next_links[last] = slot
+		prev_links[slot] = last
+		self.next_links[slot] = 0
+		prev_links[0] = slot
+		self.size += 1
+
+	def move_node_to_last(self, slot):
+		"""
+			move an attached slot to the end of linked list
+			this is the hot path of LRU so the links are rewired inline
+			and the slot is not validated
+		"""
+		next_links = self.next_links
+		prev_links = self.prev_links
+		last = prev_links[0]
+		if last == slot:
+			return
+		next_slot = next_links[slot]
+		prev_slot = prev_links[slot]
+		next_links[prev_slot] = next_slot
+		prev_links[next_slot] = prev_slot
+		next_links[last] = slot
+		prev_links[slot] = last
+		next_links[slot] = 0
+		prev_links[0] = slot
+
+	def add_element_at_last(self, element):
+		"""
+			Add the element passed to the end of linked list and return its slot
+		"""
+		if element is None:
+			raise InvalidElementException(f"Element is : {element}")
+
+		slot = self._allocate_slot()
+		self.elements[slot] = element
+		self.add_node_at_last(slot)
+		return slot
+
+	def remove_node(self, slot):
+		"""
+			detach the slot and give it back to the free list for reuse
+		"""
+		self.detach_node(slot)
+		self.elements[slot] = None
+		self.next_links[slot] = self.free_head
+		self.free_head = slot
+
+	def get_element(self, slot):
+		"""
+			return the element stored in the slot
+		"""
+		return self.elements[slot]
+
+	def is_linked_list_blank(self):
+		"""
+			returns True if the linked list is blank else False
+		"""
+		return self.next_links[0] == 0
+
+	def get_first_node(self):
+		"""
+			return the slot of first node of linked list
+		"""
+		if self.is_linked_list_blank():
+			return None
+		return self.next_links[0]
+
+	def get_last_node(self):
+		"""
+			returns slot of last node of linked list
+		"""
+		if self.is_linked_list_blank():
+			return None
+		return self.prev_links[0]
@@ -0,0 +1,64 @@
+class CountMinSketch:
+	"""
+		Approximate frequency counter in fixed memory.
+
+		depth rows of width small counters (one byte each, saturating at
+		max_count). A key increments one counter per row and its estimate is the
+		minimum of those counters, so it can only over estimate.
+		After sample_size increments every counter is halved so that old
+		frequencies fade away and the sketch follows the recent workload.
+	"""
+	MASK_64 = (1 << 64) - 1
+	SEEDS = (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93,
+		0xFF51AFD7ED558CCD, 0xC4CEB9FE1A85EC53, 0x27D4EB2F165667C5, 0x94D049BB133111EB)
+	HALVE = bytes(count >> 1 for count in range(256))
+
+	def __init__(self, capacity, depth=4, max_count=15) -> None:
+		if depth > len(self.SEEDS):
+			raise ValueError(f"depth can be at most {len(self.SEEDS)}")
+		width_bits = max(4, (max(capacity, 1) - 1).bit_length())
+		self.width = 1 << width_bits
+		self.shift = 64 - width_bits
+		self.depth = depth
+		self.max_count = max_count
+		self.table = bytearray(self.width * depth)
+		self.sample_size = 10 * max(capacity, 1)
+		self.additions = 0
+
+	def _indexes(self, key):
+		"""
+			position of the key's counter in every row
+		"""
+		key_hash = hash(key) & self.MASK_64
+		width = self.width
+		shift = self.shift
+		mask = self.MASK_64
+		return [row * width + ((((key_hash ^ seed) * seed) & mask) >> shift)
+			for row, seed in enumerate(self.SEEDS[:self.depth])]
+
+	def increment(self, key):
+		"""
+			count one more occurrence of the key
+		"""
+		table = self.table
+		max_count = self.max_count
+		for index in self._indexes(key):
+			if table[index] < max_count:
+				table[index] += 1
+		self.additions += 1
+		if self.additions >= self.sample_size:
+			self.reset()
+
+	def estimate(self, key):
+		"""
+			estimated number of occurrences of the key
+		"""
+		table = self.table
+		return min(table[index] for index in self._indexes(key))
+
+	def reset(self):
+		"""
+			halve all the counters to age the recorded frequencies
+		"""
+		self.table = bytearray(self.table.translate(self.HALVE))
+		self.additions //= 2
@@ -28,17 +28,28 @@ class DoublyLinkedList:
 		"""
 			Add the node passed to the end of linked list
 		"""
-		prev_node = self.dummy_tail
+		prev_node = self.dummy_tail.prev
 		prev_node.next = node
 		node.prev = prev_node
 		self.dummy_tail.prev = node
 		node.next = self.dummy_tail
 
+	def add_node_after(self, node, new_node):
+		"""
+			Add the new node right after the given node of linked list
+			given node can be dummy_head to add at start
+		"""
+		next_node = node.next
+		node.next = new_node
+		new_node.prev = node
+		new_node.next = next_node
+		next_node.prev = new_node
+
 	def add_element_at_last(self, element):
 		"""
 			Add the element passed to the end of linked list
 		"""
-		if not element:
+		if element is None:
 			raise InvalidElementException(f"Element is : {element}")
 
 		new_node = DoubleLinkedListNode(element)
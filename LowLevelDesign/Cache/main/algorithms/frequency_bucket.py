@@ -0,0 +1,11 @@
+from algorithms.doubly_linked_list import DoublyLinkedList
+
+
+class FrequencyBucket:
+	"""
+		All the keys accessed the same number of times
+		keys are kept in a linked list, least recently used first
+	"""
+	def __init__(self, frequency) -> None:
+		self.frequency = frequency
+		self.keys = DoublyLinkedList()
@@ -0,0 +1,59 @@
+"""
+	Memory against CPU of CompressedStorage: bytes stored, put and get
+	throughput for JSON blobs with no compression, zlib and lzma.
+
+	run from LowLevelDesign/Cache/main
+		python -m benchmarks.compression_benchmark [entries] [blob size]
+"""
+import json
+import random
+import sys
+import time
+
+from cache.factories.cache_factory import CacheFactory
+
+
+def blob(rng, size):
+	"""
+		JSON text of about size bytes with the repetition of real API payloads
+	"""
+	records = []
+	length = 0
+	while length < size:
+		record = {'id': rng.randrange(10**9), 'name': rng.choice(['alice', 'bob', 'carol']),
+			'active': rng.random() < 0.5, 'score': round(rng.random() * 100, 2), 'tags': rng.sample(range(20), 3)}
+		records.append(record)
+		length += len(json.dumps(record))
+	return json.dumps(records)
+
+
+def run(cache, values):
+	start = time.perf_counter()
+	for key, value in enumerate(values):
+		cache.put(key, value)
+	put_rate = len(values) / (time.perf_counter() - start)
+	start = time.perf_counter()
+	for key in range(len(values)):
+		cache.get(key)
+	get_rate = len(values) / (time.perf_counter() - start)
+	return put_rate, get_rate
+
+
+def main(entries=2_000, blob_size=8_192):
+	rng = random.Random(1)
+	values = [blob(rng, blob_size) for _ in range(entries)]
+	raw_bytes = sum(len(value.encode()) for value in values)
+	factory = CacheFactory()
+	print(f"{entries} JSON values of ~{blob_size} bytes")
+	print(f"{'codec':<10}{'stored bytes':>16}{'ratio':>8}{'puts/sec':>12}{'gets/sec':>12}")
+	put_rate, get_rate = run(factory.default_cache(entries), values)
+	print(f"{'none':<10}{raw_bytes:>16,}{1:>8.2f}{put_rate:>12,.0f}{get_rate:>12,.0f}")
+	for codec in ('zlib', 'lzma'):
+		cache = factory.compressed_cache(entries, codec)
+		put_rate, get_rate = run(cache, values)
+		stats = cache.storage.stats()
+		print(f"{codec:<10}{stats['stored_bytes']:>16,}{stats['ratio']:>8.2f}{put_rate:>12,.0f}{get_rate:>12,.0f}")
+
+
+if __name__ == "__main__":
+	main(*(int(arg) for arg in sys.argv[1:3]))
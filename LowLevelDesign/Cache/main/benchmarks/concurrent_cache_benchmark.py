@@ -0,0 +1,75 @@
+"""
+	Multi threaded throughput of ConcurrentCache for different shard counts,
+	with and without buffered reads, against one Cache behind a global lock.
+
+	run from LowLevelDesign/Cache/main
+		python -m benchmarks.concurrent_cache_benchmark [threads] [operations per thread]
+"""
+import random
+import sys
+import threading
+import time
+
+from cache.factories.cache_factory import CacheFactory
+
+
+CAPACITY = 10_000
+KEY_SPACE = 20_000
+SHARD_COUNTS = (1, 4, 16, 64)
+
+
+class GlobalLockCache:
+	"""
+		baseline: a single cache where every operation takes one lock
+	"""
+	def __init__(self, cache) -> None:
+		self.cache = cache
+		self.lock = threading.Lock()
+
+	def put(self, key, value):
+		with self.lock:
+			self.cache.put(key, value)
+
+	def get(self, key):
+		with self.lock:
+			return self.cache.get(key)
+
+
+def worker(cache, operations, seed, barrier):
+	"""
+		90% reads and 10% writes, put on a miss
+	"""
+	rng = random.Random(seed)
+	keys = [int(rng.paretovariate(1.2)) % KEY_SPACE for _ in range(operations)]
+	barrier.wait()
+	for index, key in enumerate(keys):
+		if index % 10 == 0 or cache.get(key) is None:
+			cache.put(key, key)
+
+
+def run(cache, threads, operations):
+	barrier = threading.Barrier(threads + 1)
+	workers = [threading.Thread(target=worker, args=(cache, operations, seed, barrier)) for seed in range(threads)]
+	for thread in workers:
+		thread.start()
+	barrier.wait()
+	start = time.perf_counter()
+	for thread in workers:
+		thread.join()
+	return threads * operations / (time.perf_counter() - start)
+
+
+def main(threads=8, operations=50_000):
+	factory = CacheFactory()
+	print(f"{threads} threads, {operations} operations each")
+	print(f"{'cache':<36}{'ops/sec':>14}")
+	print(f"{'global lock':<36}{run(GlobalLockCache(factory.default_cache(CAPACITY)), threads, operations):>14,.0f}")
+	for shard_count in SHARD_COUNTS:
+		for buffer_reads in (False, True):
+			cache = factory.concurrent_cache(CAPACITY, shard_count, buffer_reads)
+			name = f"{shard_count} shards" + (" + read buffer" if buffer_reads else "")
+			print(f"{name:<36}{run(cache, threads, operations):>14,.0f}")
+
+
+if __name__ == "__main__":
+	main(*(int(arg) for arg in sys.argv[1:3]))
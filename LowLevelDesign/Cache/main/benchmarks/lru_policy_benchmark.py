@@ -0,0 +1,74 @@
+"""
+	Compare memory and throughput of LRUEvictionPolicy (node objects)
+	against ArrayLRUEvictionPolicy (integer link arrays).
+
+	run from LowLevelDesign/Cache/main
+		python -m benchmarks.lru_policy_benchmark [keys]
+"""
+import gc
+import random
+import sys
+import time
+import tracemalloc
+
+from cache.policies.LRU_eviction_policy import LRUEvictionPolicy
+from cache.policies.array_LRU_eviction_policy import ArrayLRUEvictionPolicy
+
+
+def measure_memory(policy_class, keys):
+	"""
+		bytes allocated and gc tracked objects created to hold keys in the policy
+	"""
+	gc.collect()
+	objects_before = len(gc.get_objects())
+	tracemalloc.start()
+	policy = policy_class(len(keys)) if policy_class is ArrayLRUEvictionPolicy else policy_class()
+	for key in keys:
+		policy.key_accessed(key)
+	current, _ = tracemalloc.get_traced_memory()
+	tracemalloc.stop()
+	objects_after = len(gc.get_objects())
+	return policy, current, objects_after - objects_before
+
+
+def measure_ops(policy, keys, operations):
+	"""
+		ops/sec of a mixed workload, 90% hits on existing keys and 10% evict + insert
+	"""
+	rng = random.Random(7)
+	accesses = [rng.choice(keys) for _ in range(operations)]
+	next_key = len(keys)
+	start = time.perf_counter()
+	for index, key in enumerate(accesses):
+		if index % 10 == 0:
+			policy.evict_key()
+			policy.key_accessed(next_key)
+			next_key += 1
+		else:
+			policy.key_accessed(key)
+	elapsed = time.perf_counter() - start
+	return operations / elapsed
+
+
+def measure_gc_pause(policy):
+	"""
+		time of a full collection while the policy is alive
+	"""
+	start = time.perf_counter()
+	gc.collect()
+	return (time.perf_counter() - start) * 1000
+
+
+def main(key_count=200_000):
+	keys = list(range(key_count))
+	print(f"{'policy':<26}{'bytes/key':>12}{'gc objs/key':>14}{'ops/sec':>14}{'gc ms':>10}")
+	for policy_class in (LRUEvictionPolicy, ArrayLRUEvictionPolicy):
+		policy, memory, objects = measure_memory(policy_class, keys)
+		ops = measure_ops(policy, keys, key_count)
+		pause = measure_gc_pause(policy)
+		print(f"{policy_class.__name__:<26}{memory / key_count:>12.1f}{objects / key_count:>14.2f}{ops:>14,.0f}{pause:>10.1f}")
+		del policy
+
+
+if __name__ == "__main__":
+	main(*(int(arg) for arg in sys.argv[1:2]))
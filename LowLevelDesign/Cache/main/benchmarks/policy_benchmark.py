@@ -0,0 +1,134 @@
+"""
+	Replay synthetic and recorded traces against caches built by CacheFactory
+	and report hit ratio, ops/sec and peak memory per policy and capacity.
+
+	run from LowLevelDesign/Cache/main
+		python -m benchmarks.policy_benchmark --capacities 100 1000 --json results.json
+		python -m benchmarks.policy_benchmark --trace-file access.log --policies lru arc
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+from benchmarks import traces
+from cache.factories.cache_factory import CacheFactory
+
+
+def policies():
+	"""
+		policy name -> function building a cache of given capacity
+	"""
+	factory = CacheFactory()
+	return {
+		'lru': factory.default_cache,
+		'array_lru': factory.array_lru_cache,
+		'lfu': factory.lfu_cache,
+		'lfu_aging': lambda capacity: factory.lfu_cache(capacity, dynamic_aging=True),
+		'tiny_lfu': factory.tiny_lfu_cache,
+		'arc': factory.arc_cache,
+	}
+
+
+def synthetic_traces(length, capacity):
+	"""
+		trace name -> trace, sized relative to the cache capacity
+		so every capacity sees the same shape of workload
+	"""
+	key_space = capacity * 10
+	return {
+		'zipf_0.6': traces.zipf_trace(length, key_space, 0.6),
+		'zipf_0.9': traces.zipf_trace(length, key_space, 0.9),
+		'zipf_1.2': traces.zipf_trace(length, key_space, 1.2),
+		'scan': traces.scan_trace(length, capacity * 2, capacity // 2, capacity * 5),
+		'loop': traces.loop_trace(length, capacity + capacity // 10),
+		'shifting': traces.shifting_trace(length, key_space, 5),
+	}
+
+
+def replay(cache, trace):
+	"""
+		get every key and put it on a miss, return number of hits
+	"""
+	hits = 0
+	get = cache.get
+	put = cache.put
+	for key in trace:
+		if get(key) is None:
+			put(key, key)
+		else:
+			hits += 1
+	return hits
+
+
+def measure(build, capacity, trace):
+	start = time.perf_counter()
+	hits = replay(build(capacity), trace)
+	elapsed = time.perf_counter() - start
+
+	# memory is measured on a separate run, tracing slows down allocations
+	tracemalloc.start()
+	replay(build(capacity), trace)
+	_, peak = tracemalloc.get_traced_memory()
+	tracemalloc.stop()
+	return {
+		'hit_ratio': hits / len(trace) if trace else 0.0,
+		'ops_per_sec': len(trace) / elapsed if elapsed else 0.0,
+		'peak_bytes': peak,
+	}
+
+
+def run(capacities, length, policy_names, trace_files):
+	builders = policies()
+	recorded = {os.path.basename(path): traces.read_trace_file(path) for path in trace_files}
+	results = []
+	for capacity in capacities:
+		trace_set = dict(recorded) if trace_files else synthetic_traces(length, capacity)
+		for trace_name, trace in trace_set.items():
+			for policy_name in policy_names:
+				result = {'trace': trace_name, 'policy': policy_name, 'capacity': capacity, 'accesses': len(trace)}
+				result.update(measure(builders[policy_name], capacity, trace))
+				results.append(result)
+				print_row(result)
+	return results
+
+
+def print_header():
+	print(f"{'trace':<16}{'policy':<12}{'capacity':>10}{'hit ratio':>11}{'ops/sec':>12}{'peak KiB':>11}")
+
+
+def print_row(result):
+	print(f"{result['trace']:<16}{result['policy']:<12}{result['capacity']:>10}"
+		f"{result['hit_ratio']:>11.4f}{result['ops_per_sec']:>12,.0f}{result['peak_bytes'] / 1024:>11.1f}")
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument('--capacities', type=int, nargs='+', default=[100, 1000])
+	parser.add_argument('--length', type=int, default=100_000, help='accesses per synthetic trace')
+	parser.add_argument('--policies', nargs='+', choices=sorted(policies()), default=list(policies()))
+	parser.add_argument('--trace-file', action='append', default=[], help='recorded trace, replaces the synthetic ones')
+	parser.add_argument('--json', help='write machine readable results to this file, - for stdout')
+	args = parser.parse_args(argv)
+
+	print_header()
+	results = run(args.capacities, args.length, args.policies, args.trace_file)
+	if args.json:
+		report = {
+			'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+			'python': platform.python_version(),
+			'results': results,
+		}
+		if args.json == '-':
+			json.dump(report, sys.stdout, indent=2)
+			print()
+		else:
+			with open(args.json, 'w') as json_file:
+				json.dump(report, json_file, indent=2)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,91 @@
+"""
+	Worker processes sharing one SharedMemoryStorage cache against each
+	worker holding its own HashMapBasedStorage cache of the same capacity.
+	Reports aggregate ops/sec, hit ratio and memory held by caches.
+
+	run from LowLevelDesign/Cache/main
+		python -m benchmarks.shared_memory_benchmark [workers] [operations per worker]
+"""
+import multiprocessing
+import sys
+import time
+import tracemalloc
+
+from benchmarks.traces import zipf_trace
+from cache.factories.cache_factory import CacheFactory
+
+
+CAPACITY = 16 * 1024
+KEY_SPACE = 100_000
+VALUE = b'v' * 100
+
+
+def replay(cache, trace):
+	hits = 0
+	for key in trace:
+		if cache.get(key) is None:
+			cache.put(key, VALUE)
+		else:
+			hits += 1
+	return hits
+
+
+def worker(cache, seed, operations, start, results):
+	trace = [b'%d' % key for key in zipf_trace(operations, KEY_SPACE, 0.9, seed)]
+	start.wait()
+	began = time.perf_counter()
+	hits = replay(cache, trace)
+	results.put((hits, time.perf_counter() - began))
+
+
+def run(build, workers, operations):
+	"""
+		build() makes the cache given to a worker, return ops/sec and hit ratio
+	"""
+	start = multiprocessing.Event()
+	results = multiprocessing.Queue()
+	processes = [multiprocessing.Process(target=worker, args=(build(), seed, operations, start, results))
+		for seed in range(workers)]
+	for process in processes:
+		process.start()
+	start.set()
+	outcomes = [results.get() for _ in processes]
+	for process in processes:
+		process.join()
+	hits = sum(hits for hits, _ in outcomes)
+	slowest = max(elapsed for _, elapsed in outcomes)
+	return workers * operations / slowest, hits / (workers * operations)
+
+
+def private_cache_bytes():
+	"""
+		memory held by one full private cache
+	"""
+	tracemalloc.start()
+	cache = CacheFactory().default_cache(CAPACITY)
+	for key in range(CAPACITY):
+		cache.put(b'%d' % key, bytes(VALUE))
+	memory = tracemalloc.get_traced_memory()[0]
+	tracemalloc.stop()
+	return memory
+
+
+def main(workers=4, operations=100_000):
+	factory = CacheFactory()
+	shared = factory.shared_memory_cache(bucket_count=CAPACITY // 8, slots_per_bucket=8, max_key_size=16, max_value_size=len(VALUE))
+	try:
+		shared_ops, shared_hits = run(lambda: shared, workers, operations)
+		shared_bytes = shared.storage.memory.size
+	finally:
+		shared.storage.close()
+	private_ops, private_hits = run(lambda: factory.default_cache(CAPACITY), workers, operations)
+	private_bytes = workers * private_cache_bytes()
+
+	print(f"{workers} workers, {operations} operations each, capacity {CAPACITY}")
+	print(f"{'cache':<22}{'ops/sec':>12}{'hit ratio':>11}{'cache MiB':>11}")
+	print(f"{'private per worker':<22}{private_ops:>12,.0f}{private_hits:>11.4f}{private_bytes / 2 ** 20:>11.1f}")
+	print(f"{'shared memory':<22}{shared_ops:>12,.0f}{shared_hits:>11.4f}{shared_bytes / 2 ** 20:>11.1f}")
+
+
+if __name__ == "__main__":
+	main(*(int(arg) for arg in sys.argv[1:3]))
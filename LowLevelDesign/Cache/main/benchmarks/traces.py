@@ -0,0 +1,65 @@
+"""
+	Access traces for replaying against caches, each one is a list of keys.
+"""
+import itertools
+import random
+
+
+def zipf_trace(length, key_space, skew, seed=0):
+	"""
+		keys drawn from a zipf distribution, key i has weight 1 / (i + 1) ** skew
+		higher skew means a smaller hot set
+	"""
+	rng = random.Random(seed)
+	cum_weights = list(itertools.accumulate(1 / (rank + 1) ** skew for rank in range(key_space)))
+	return rng.choices(range(key_space), cum_weights=cum_weights, k=length)
+
+
+def scan_trace(length, key_space, hot_keys, scan_every, seed=0):
+	"""
+		zipf traffic on hot_keys interrupted by sequential scans over keys never seen before
+		every scan_every accesses a scan of key_space keys is inserted
+	"""
+	hot = zipf_trace(length, hot_keys, 0.9, seed)
+	trace = []
+	next_scan_key = hot_keys
+	for start in range(0, length, scan_every):
+		trace.extend(hot[start:start + scan_every])
+		trace.extend(range(next_scan_key, next_scan_key + key_space))
+		next_scan_key += key_space
+	return trace[:length]
+
+
+def loop_trace(length, loop_size):
+	"""
+		the same loop_size keys accessed over and over in order, LRU's worst case
+		when loop_size is just above capacity
+	"""
+	return [index % loop_size for index in range(length)]
+
+
+def shifting_trace(length, key_space, phases, skew=0.9, seed=0):
+	"""
+		zipf traffic whose hot set moves to a new range of keys in each phase
+	"""
+	phase_length = max(1, length // phases)
+	trace = []
+	for phase in range(phases):
+		offset = phase * key_space
+		trace.extend(offset + key for key in zipf_trace(phase_length, key_space, skew, seed + phase))
+	return trace
+
+
+def read_trace_file(path):
+	"""
+		recorded trace, one access per line, key is the first comma or space separated field
+		blank lines and lines starting with # are skipped
+	"""
+	trace = []
+	with open(path) as trace_file:
+		for line in trace_file:
+			line = line.strip()
+			if not line or line.startswith('#'):
+				continue
+			trace.append(line.replace(',', ' ').split()[0])
+	return trace
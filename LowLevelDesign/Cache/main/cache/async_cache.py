@@ -0,0 +1,76 @@
+import asyncio
+import inspect
+from time import perf_counter_ns
+
+from cache.load_failure import LoadFailure
+
+
+class AsyncCache:
+	"""
+		asyncio front of a Cache with single flight loading.
+
+		get_or_load runs the loader only once per key at a time, concurrent
+		misses on the same key await the same in flight load. Cache operations
+		are in memory and run directly on the event loop, a loader which is a
+		plain function runs in the loop's default executor so it can't block it.
+
+		With negative_ttl an exception raised by the loader is cached for that
+		many seconds and raised to callers instead of loading again.
+	"""
+	def __init__(self, cache, negative_ttl=None) -> None:
+		self.cache = cache
+		self.negative_ttl = negative_ttl
+		self.in_flight = {}		# key -> task loading the key
+
+	async def get(self, key):
+		value = self.cache.get(key)
+		if isinstance(value, LoadFailure):
+			return None
+		return value
+
+	async def put(self, key, value, ttl=None):
+		self.cache.put(key, value, ttl)
+
+	async def get_or_load(self, key, loader, ttl=None):
+		"""
+			return cached value of key or the value returned by loader(key)
+			loader may be a coroutine function or a plain function
+			a loader returning None is not cached
+		"""
+		value = self.cache.get(key)
+		if isinstance(value, LoadFailure):
+			raise value.exception
+		if value is not None:
+			return value
+
+		task = self.in_flight.get(key)
+		if task is None:
+			task = asyncio.ensure_future(self._load(key, loader, ttl))
+			self.in_flight[key] = task
+		# shield so a cancelled caller doesn't cancel the load other callers wait for
+		return await asyncio.shield(task)
+
+	async def _load(self, key, loader, ttl):
+		stats = self.cache.stats
+		started = perf_counter_ns()
+		try:
+			if inspect.iscoroutinefunction(loader):
+				value = await loader(key)
+			else:
+				value = await asyncio.get_running_loop().run_in_executor(None, loader, key)
+		except Exception as e:
+			if stats is not None:
+				stats.load_failures += 1
+				stats.record_latency('load', perf_counter_ns() - started)
+			if self.negative_ttl is not None:
+				self.cache.put(key, LoadFailure(e), self.negative_ttl)
+			raise
+		finally:
+			del self.in_flight[key]
+
+		if stats is not None:
+			stats.load_successes += 1
+			stats.record_latency('load', perf_counter_ns() - started)
+		if value is not None:
+			self.cache.put(key, value, ttl)
+		return value
@@ -0,0 +1,27 @@
+from abc import ABC, abstractmethod
+
+
+class BackingStore(ABC):
+	"""
+		Slow durable store behind a write behind cache, written in batches
+	"""
+	@abstractmethod
+	def write_many(self, items):
+		"""
+			insert or replace all the (key, value) pairs of items dict
+		"""
+		pass
+
+	@abstractmethod
+	def delete_many(self, keys):
+		pass
+
+	@abstractmethod
+	def read(self, key):
+		"""
+			return the stored value of key or None
+		"""
+		pass
+
+	def close(self):
+		pass
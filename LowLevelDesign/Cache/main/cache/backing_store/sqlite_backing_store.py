@@ -0,0 +1,40 @@
+import pickle
+import sqlite3
+import threading
+
+from cache.backing_store.backing_store import BackingStore
+
+
+class SQLiteBackingStore(BackingStore):
+	"""
+		Reference BackingStore keeping pickled keys and values in a sqlite3 table.
+		A batch is written with one executemany inside one transaction.
+	"""
+	def __init__(self, path, table='cache') -> None:
+		if not table.isidentifier():
+			raise ValueError(f"invalid table name {table}")
+		self.table = table
+		# the write behind worker thread writes with this connection too
+		self.connection = sqlite3.connect(path, check_same_thread=False)
+		self.lock = threading.Lock()
+		with self.lock, self.connection:
+			self.connection.execute(f"CREATE TABLE IF NOT EXISTS {table} (key BLOB PRIMARY KEY, value BLOB)")
+
+	def write_many(self, items):
+		rows = [(pickle.dumps(key), pickle.dumps(value)) for key, value in items.items()]
+		with self.lock, self.connection:
+			self.connection.executemany(f"INSERT OR REPLACE INTO {self.table} (key, value) VALUES (?, ?)", rows)
+
+	def delete_many(self, keys):
+		rows = [(pickle.dumps(key),) for key in keys]
+		with self.lock, self.connection:
+			self.connection.executemany(f"DELETE FROM {self.table} WHERE key = ?", rows)
+
+	def read(self, key):
+		with self.lock:
+			row = self.connection.execute(f"SELECT value FROM {self.table} WHERE key = ?", (pickle.dumps(key),)).fetchone()
+		return None if row is None else pickle.loads(row[0])
+
+	def close(self):
+		with self.lock:
+			self.connection.close()
@@ -1,32 +1,203 @@
+import time
+from time import perf_counter_ns
+
 from cache.exceptions.not_found_exception import NotFoundException
 from cache.exceptions.storage_full_exception import StorageFullException
+from cache.expiration.expiry_tracker import ExpiryTracker
 from cache.policies.eviction_policy import EvictionPolicy
+from cache.stats.cache_stats import CacheStats
 from cache.storage.storage import Storage
 
 
 class Cache:
-	def __init__(self, eviction_policy: EvictionPolicy, storage: Storage) -> None:
+	EXPIRY_SAMPLE_SIZE = 20
+	EXPIRY_REPEAT_THRESHOLD = 0.25
+
+	def __init__(self, eviction_policy: EvictionPolicy, storage: Storage, clock=time.monotonic, stats: CacheStats = None) -> None:
+		"""
+			stats is None unless statistics should be recorded
+		"""
 		self.eviction_policy = eviction_policy
 		self.storage = storage
+		self.clock = clock
+		self.expiry = ExpiryTracker()
+		self.stats = stats
+		if stats is not None:
+			stats.register_gauge('size', storage.size)
+			stats.register_gauge('weight', storage.weight)
 
-	def put(self, key, value):
-		try:
-			self.storage.add(key, value)
-			self.eviction_policy.key_accessed()
-		except StorageFullException as e:
-			print(f"Storage full will try to evict: {e}")
-			key_to_remove = self.eviction_policy.evict_key()
-			if not key_to_remove:
-				raise Exception("Unexpected State. Storage full and no key to evict.")
-			self.storage.remove(key_to_remove)
-			print(f"Creating space by evicting item {key_to_remove}")
-			self.put(key, value)
+	def put(self, key, value, ttl=None):
+		"""
+			ttl is the number of seconds after which the key expires
+			putting a key without ttl removes its previous expiry
+			keys are evicted until the storage has room for the entry
+		"""
+		if ttl is not None and ttl <= 0:
+			raise ValueError(f"ttl should be positive, got {ttl}")
+		stats = self.stats
+		if stats is not None:
+			started = perf_counter_ns()
+		while True:
+			try:
+				self.storage.add(key, value)
+				break
+			except StorageFullException:
+				key_to_remove = self.eviction_policy.evict_key()
+				if key_to_remove is None:
+					raise Exception("Unexpected State. Storage full and no key to evict.")
+				self.storage.remove(key_to_remove)
+				self.expiry.discard(key_to_remove)
+				if stats is not None:
+					stats.evictions += 1
+		self.eviction_policy.key_accessed(key)
+		if ttl is None:
+			self.expiry.discard(key)
+		else:
+			self.expiry.set(key, self.clock() + ttl)
+		if stats is not None:
+			stats.record_latency('put', perf_counter_ns() - started)
 
 	def get(self, key):
+		stats = self.stats
+		if stats is not None:
+			started = perf_counter_ns()
+		value = None
+		hit = False
+		if len(self.expiry) and self.expiry.is_expired(key, self.clock()):
+			self._expire(key)
+		else:
+			try:
+				value = self.storage.get(key)
+				self.eviction_policy.key_accessed(key)
+				hit = True
+			except NotFoundException:
+				pass
+		if stats is not None:
+			if hit:
+				stats.hits += 1
+			else:
+				stats.misses += 1
+			stats.record_latency('get', perf_counter_ns() - started)
+		return value
+
+	def put_many(self, items, ttl=None):
+		"""
+			put all (key, value) pairs of items (a dict or an iterable of pairs)
+			the evictions needed to fit them are computed and done as one group
+		"""
+		if ttl is not None and ttl <= 0:
+			raise ValueError(f"ttl should be positive, got {ttl}")
+		stats = self.stats
+		if stats is not None:
+			started = perf_counter_ns()
+		items = dict(items)
+		overflow = self.storage.overflow(items)
+		size = self.storage.size()
+		if overflow and size is not None and overflow > size:
+			# items alone are more than the capacity, evicting the whole
+			# cache up front wouldn't make them fit, put them one by one
+			overflow = None
+		while overflow:
+			evicted = self.eviction_policy.evict_keys(overflow)
+			if not evicted:
+				break
+			self.storage.remove_many(evicted)
+			for key in evicted:
+				self.expiry.discard(key)
+			if stats is not None:
+				stats.evictions += len(evicted)
+			# evicted keys which are part of items didn't free any space
+			overflow = self.storage.overflow(items)
+		if overflow is None or overflow:
+			# storage can't report space or items are more than its capacity
+			for key, value in items.items():
+				self.put(key, value, ttl)
+		else:
+			self._add_many(items, ttl)
+		if stats is not None:
+			stats.record_latency('put_many', perf_counter_ns() - started)
+
+	def _add_many(self, items, ttl):
+		"""
+			add items which are known to fit in storage
+		"""
+		self.storage.add_many(items.items())
+		self.eviction_policy.keys_accessed(items)
+		if ttl is None:
+			if len(self.expiry):
+				for key in items:
+					self.expiry.discard(key)
+		else:
+			deadline = self.clock() + ttl
+			for key in items:
+				self.expiry.set(key, deadline)
+
+	def get_many(self, keys):
+		"""
+			return dict of found keys with values and list of missing keys
+		"""
+		stats = self.stats
+		if stats is not None:
+			started = perf_counter_ns()
+		keys = list(keys)
+		if len(self.expiry):
+			now = self.clock()
+			for key in keys:
+				if self.expiry.is_expired(key, now):
+					self._expire(key)
+		found, missing = self.storage.get_many(keys)
+		self.eviction_policy.keys_accessed(found)
+		if stats is not None:
+			stats.hits += len(found)
+			stats.misses += len(missing)
+			stats.record_latency('get_many', perf_counter_ns() - started)
+		return found, missing
+
+	def delete_many(self, keys):
+		"""
+			remove the keys from cache, return the keys which existed
+		"""
+		stats = self.stats
+		if stats is not None:
+			started = perf_counter_ns()
+		removed = self.storage.remove_many(keys)
+		self.eviction_policy.remove_keys(removed)
+		for key in removed:
+			self.expiry.discard(key)
+		if stats is not None:
+			stats.record_latency('delete_many', perf_counter_ns() - started)
+		return removed
+
+	def _expire(self, key):
+		"""
+			remove an expired key from storage, policy and expiry tracker
+		"""
+		self.expiry.discard(key)
+		self.eviction_policy.remove_key(key)
 		try:
-			value = self.storage.get(key)
-			self.eviction_policy.key_accessed(key)
-			return value
-		except NotFoundException as e:
-			print(f"Tried to access non-existing key {e}")
-			return None
+			self.storage.remove(key)
+		except NotFoundException:
+			pass
+		if self.stats is not None:
+			self.stats.expirations += 1
+
+	def expire_cycle(self, sample_size=EXPIRY_SAMPLE_SIZE, threshold=EXPIRY_REPEAT_THRESHOLD, time_limit=0.001):
+		"""
+			active expiry: sample keys having a ttl and remove the expired ones
+			sample again while more than threshold of the sample was expired
+			and time_limit seconds are not spent, return number of expired keys
+		"""
+		started = self.clock()
+		expired = 0
+		while len(self.expiry):
+			now = self.clock()
+			sample = self.expiry.sample(sample_size)
+			expired_in_sample = 0
+			for key in sample:
+				if self.expiry.is_expired(key, now):
+					self._expire(key)
+					expired_in_sample += 1
+			expired += expired_in_sample
+			if expired_in_sample <= threshold * len(sample) or self.clock() - started >= time_limit:
+				break
+		return expired
@@ -0,0 +1,179 @@
+import threading
+from collections import deque
+from time import perf_counter_ns
+
+from cache.exceptions.not_found_exception import NotFoundException
+from cache.stats.cache_stats import CacheStats
+
+
+class ConcurrentCache:
+	"""
+		Thread safe cache made of independent shards.
+
+		Every key belongs to one shard by its hash, a shard is a normal Cache
+		(own Storage and EvictionPolicy) guarded by its own lock, so threads
+		working on different shards never wait for each other.
+
+		With buffer_reads a get reads the shard's storage without the lock and
+		only records the key in a read buffer. The recorded accesses are applied
+		to the eviction policy in a batch by whichever thread finds the buffer
+		full and the lock free. This relies on Storage.get being safe to call
+		while another thread writes, which holds for HashMapBasedStorage.
+		With stats the hit or miss and latency of a buffered read are also
+		queued and recorded into the shard's stats when the buffer is drained.
+	"""
+	READ_BUFFER_SIZE = 64
+
+	def __init__(self, shards, buffer_reads=False) -> None:
+		self.shards = shards
+		self.locks = [threading.Lock() for _ in shards]
+		self.buffer_reads = buffer_reads
+		self.read_buffers = [deque() for _ in shards]
+
+	def _shard_index(self, key):
+		return hash(key) % len(self.shards)
+
+	def put(self, key, value, ttl=None):
+		index = self._shard_index(key)
+		with self.locks[index]:
+			if self.buffer_reads:
+				# recency of buffered reads should count before evicting
+				self._drain(index)
+			self.shards[index].put(key, value, ttl)
+
+	def get(self, key):
+		index = self._shard_index(key)
+		if not self.buffer_reads:
+			with self.locks[index]:
+				return self.shards[index].get(key)
+
+		shard = self.shards[index]
+		if shard.expiry.is_expired(key, shard.clock()):
+			with self.locks[index]:
+				return shard.get(key)
+		if shard.stats is not None:
+			started = perf_counter_ns()
+		read_buffer = self.read_buffers[index]
+		try:
+			value = shard.storage.get(key)
+			hit = True
+		except NotFoundException:
+			value = None
+			hit = False
+		if shard.stats is not None:
+			read_buffer.append((key, hit, perf_counter_ns() - started))
+		elif not hit:
+			return None
+		else:
+			read_buffer.append((key, hit, None))
+		if len(read_buffer) >= self.READ_BUFFER_SIZE:
+			self._try_drain(index)
+		return value
+
+	def _try_drain(self, index):
+		"""
+			apply buffered reads to the shard's policy if nobody holds the lock
+			readers never wait here, a busy lock means someone else will drain
+		"""
+		lock = self.locks[index]
+		if not lock.acquire(blocking=False):
+			return
+		try:
+			self._drain(index)
+		finally:
+			lock.release()
+
+	def _drain(self, index):
+		"""
+			must be called holding the shard's lock
+		"""
+		shard = self.shards[index]
+		stats = shard.stats
+		read_buffer = self.read_buffers[index]
+		for _ in range(len(read_buffer)):
+			key, hit, latency = read_buffer.popleft()
+			if stats is not None:
+				if hit:
+					stats.hits += 1
+				else:
+					stats.misses += 1
+				stats.record_latency('get', latency)
+			if not hit:
+				continue
+			try:
+				shard.storage.get(key)
+			except NotFoundException:
+				continue		# evicted or expired since it was read
+			shard.eviction_policy.key_accessed(key)
+
+	def _group_by_shard(self, keys):
+		groups = {}
+		for key in keys:
+			groups.setdefault(self._shard_index(key), []).append(key)
+		return groups
+
+	def put_many(self, items, ttl=None):
+		items = dict(items)
+		for index, keys in self._group_by_shard(items).items():
+			with self.locks[index]:
+				if self.buffer_reads:
+					self._drain(index)
+				self.shards[index].put_many({key: items[key] for key in keys}, ttl)
+
+	def get_many(self, keys):
+		"""
+			return dict of found keys with values and list of missing keys
+		"""
+		found = {}
+		missing = []
+		for index, shard_keys in self._group_by_shard(keys).items():
+			with self.locks[index]:
+				shard_found, shard_missing = self.shards[index].get_many(shard_keys)
+			found.update(shard_found)
+			missing.extend(shard_missing)
+		return found, missing
+
+	def delete_many(self, keys):
+		removed = []
+		for index, shard_keys in self._group_by_shard(keys).items():
+			with self.locks[index]:
+				removed.extend(self.shards[index].delete_many(shard_keys))
+		return removed
+
+	def flush_reads(self):
+		"""
+			apply all buffered reads, waiting for the locks
+		"""
+		for index in range(len(self.shards)):
+			with self.locks[index]:
+				self._drain(index)
+
+	def expire_cycle(self):
+		"""
+			run one active expiry cycle on every shard, return expired keys
+		"""
+		expired = 0
+		for index, shard in enumerate(self.shards):
+			with self.locks[index]:
+				expired += shard.expire_cycle()
+		return expired
+
+	def stats_snapshot(self):
+		"""
+			stats of all the shards added together, None if shards don't record stats
+		"""
+		if self.shards[0].stats is None:
+			return None
+		total = CacheStats()
+		gauges = {}
+		for index, shard in enumerate(self.shards):
+			with self.locks[index]:
+				total.merge(shard.stats)
+				for name, read in shard.stats.gauges.items():
+					value = read()
+					gauges.setdefault(name, None)
+					if value is not None:
+						gauges[name] = (gauges[name] or 0) + value
+		snapshot = total.snapshot()
+		snapshot.update(gauges)
+		return snapshot
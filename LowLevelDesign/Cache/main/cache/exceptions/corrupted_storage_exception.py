@@ -0,0 +1,5 @@
+class CorruptedStorageException(Exception):
+	'''
+		Persistent storage file can't be trusted
+	'''
+	pass
@@ -0,0 +1,5 @@
+class EntryTooLargeException(Exception):
+	'''
+		Entry is larger than what storage accepts for a single entry
+	'''
+	pass
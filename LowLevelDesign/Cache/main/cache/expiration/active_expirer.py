@@ -0,0 +1,29 @@
+import threading
+
+
+class ActiveExpirer(threading.Thread):
+	"""
+		Background thread running cache.expire_cycle every interval seconds.
+
+		Cache is not thread safe, so every cycle runs under lock and any other
+		thread using the same cache has to hold the same lock.
+	"""
+	def __init__(self, cache, interval=0.1, lock=None) -> None:
+		super().__init__(daemon=True)
+		self.cache = cache
+		self.interval = interval
+		self.lock = lock or threading.Lock()
+		self.stopped = threading.Event()
+
+	def run(self):
+		while not self.stopped.wait(self.interval):
+			with self.lock:
+				self.cache.expire_cycle()
+
+	def stop(self):
+		"""
+			stop the thread and wait for the running cycle to finish
+		"""
+		self.stopped.set()
+		if self.is_alive():
+			self.join()
@@ -0,0 +1,57 @@
+import random
+
+
+class ExpiryTracker:
+	"""
+		Deadlines of the keys which have a ttl.
+
+		Keys with a deadline are also kept in a list (with their position in a
+		dict) so a random key can be sampled in O(1) and removed by swapping
+		with the last one. Active expiry samples from here and never has to
+		scan the whole keyspace.
+	"""
+	def __init__(self, rng=None) -> None:
+		self.deadlines = {}		# key -> deadline
+		self.keys = []
+		self.positions = {}		# key -> index in keys
+		self.rng = rng or random.Random()
+
+	def __len__(self):
+		return len(self.keys)
+
+	def set(self, key, deadline):
+		"""
+			set or replace the deadline of key
+		"""
+		if key not in self.positions:
+			self.positions[key] = len(self.keys)
+			self.keys.append(key)
+		self.deadlines[key] = deadline
+
+	def discard(self, key):
+		"""
+			forget the deadline of key if it has one
+		"""
+		position = self.positions.pop(key, None)
+		if position is None:
+			return
+		del self.deadlines[key]
+		last = self.keys.pop()
+		if position < len(self.keys):
+			self.keys[position] = last
+			self.positions[last] = position
+
+	def is_expired(self, key, now):
+		"""
+			True if the key has a deadline which has passed
+		"""
+		deadline = self.deadlines.get(key)
+		return deadline is not None and deadline <= now
+
+	def sample(self, count):
+		"""
+			up to count distinct random keys having a deadline
+		"""
+		keys = self.keys
+		size = len(keys)
+		return [keys[index] for index in self.rng.sample(range(size), min(count, size))]
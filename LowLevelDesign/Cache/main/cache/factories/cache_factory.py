@@ -1,10 +1,96 @@
 from cache.cache import Cache
+from cache.concurrent_cache import ConcurrentCache
+from cache.policies.ARC_eviction_policy import ARCEvictionPolicy
+from cache.policies.LFU_eviction_policy import LFUEvictionPolicy
 from cache.policies.LRU_eviction_policy import LRUEvictionPolicy
+from cache.policies.WTinyLFU_eviction_policy import WTinyLFUEvictionPolicy
+from cache.policies.array_LRU_eviction_policy import ArrayLRUEvictionPolicy
+from cache.policies.no_eviction_policy import NoEvictionPolicy
+from cache.stats.cache_stats import CacheStats
+from cache.storage.compressed_storage import CompressedStorage
+from cache.storage.deep_size import default_weigher
 from cache.storage.hashmap_based_storage import HashMapBasedStorage
+from cache.storage.mmap_storage import MmapStorage
+from cache.storage.shared_memory_storage import SharedMemoryStorage
+from cache.storage.weighted_hashmap_based_storage import WeightedHashMapBasedStorage
 
 
 class CacheFactory:	
+	def __init__(self, record_stats=False) -> None:
+		"""
+			caches built with record_stats expose a CacheStats as cache.stats
+		"""
+		self.record_stats = record_stats
+
+	def _build(self, policy, storage):
+		stats = CacheStats() if self.record_stats else None
+		return Cache(policy, storage, stats=stats)
+
 	def default_cache(self, capacity):
 		storage = HashMapBasedStorage(capacity)
 		policy = LRUEvictionPolicy()
-		return Cache(policy, storage)
+		return self._build(policy, storage)
+
+	def array_lru_cache(self, capacity):
+		storage = HashMapBasedStorage(capacity)
+		policy = ArrayLRUEvictionPolicy(capacity)
+		return self._build(policy, storage)
+
+	def lfu_cache(self, capacity, dynamic_aging=False):
+		storage = HashMapBasedStorage(capacity)
+		policy = LFUEvictionPolicy(dynamic_aging)
+		return self._build(policy, storage)
+
+	def tiny_lfu_cache(self, capacity, window_ratio=0.01, protected_ratio=0.8):
+		storage = HashMapBasedStorage(capacity)
+		policy = WTinyLFUEvictionPolicy(capacity, window_ratio, protected_ratio)
+		return self._build(policy, storage)
+
+	def arc_cache(self, capacity):
+		storage = HashMapBasedStorage(capacity)
+		policy = ARCEvictionPolicy(capacity)
+		return self._build(policy, storage)
+
+	def concurrent_cache(self, capacity, shard_count=16, buffer_reads=False):
+		shard_capacity = -(-capacity // shard_count)
+		shards = [self.default_cache(shard_capacity) for _ in range(shard_count)]
+		return ConcurrentCache(shards, buffer_reads)
+
+	def weighted_cache(self, max_bytes, weigher=default_weigher, max_entry_bytes=None):
+		storage = WeightedHashMapBasedStorage(max_bytes, weigher, max_entry_bytes)
+		policy = LRUEvictionPolicy()
+		return self._build(policy, storage)
+
+	def shared_memory_cache(self, bucket_count=1024, slots_per_bucket=8, max_key_size=64, max_value_size=1024):
+		"""
+			create before forking the worker processes, each worker gets a copy
+			of the cache pointing to the same shared memory
+		"""
+		storage = SharedMemoryStorage(bucket_count, slots_per_bucket, max_key_size, max_value_size)
+		return self._build(NoEvictionPolicy(), storage)
+
+	def mmap_cache(self, path, slot_count=1 << 16, data_capacity=64 << 20):
+		"""
+			keys already in the file are handed to the policy so they can be evicted,
+			values are not read
+		"""
+		storage = MmapStorage(path, slot_count, data_capacity)
+		policy = LRUEvictionPolicy()
+		policy.keys_accessed(storage.keys())
+		return self._build(policy, storage)
+
+	def compressed_cache(self, capacity, codec='zlib', threshold=1024, max_bytes=None):
+		"""
+			values of threshold bytes or more are compressed with codec
+			capacity is in entries, or the budget is max_bytes of compressed entries when given
+		"""
+		if max_bytes is None:
+			inner = HashMapBasedStorage(capacity)
+		else:
+			inner = WeightedHashMapBasedStorage(max_bytes)
+		storage = CompressedStorage(inner, codec, threshold)
+		cache = self._build(LRUEvictionPolicy(), storage)
+		if cache.stats is not None:
+			cache.stats.register_gauge('uncompressed_bytes', lambda: storage.uncompressed_bytes)
+			cache.stats.register_gauge('stored_bytes', lambda: storage.stored_bytes)
+		return cache
@@ -0,0 +1,7 @@
+class LoadFailure:
+	"""
+		Cached in place of a value when its loader raised,
+		so the failure is served again until it expires
+	"""
+	def __init__(self, exception) -> None:
+		self.exception = exception
@@ -0,0 +1,109 @@
+from algorithms.doubly_linked_list import DoublyLinkedList
+from cache.policies.eviction_policy import EvictionPolicy
+
+
+class ARCEvictionPolicy(EvictionPolicy):
+	"""
+		Adaptive Replacement Cache.
+
+		T1 holds keys seen once recently, T2 keys seen at least twice. B1 and B2
+		are ghost lists remembering only the keys recently evicted from T1 and
+		T2. A hit in B1 means T1 was too small so target (the desired size of
+		T1) grows, a hit in B2 shrinks it. Eviction takes from T1 when it is
+		over target else from T2, so the split between recency and frequency
+		follows the workload.
+
+		Ghost lists are trimmed so that T1 + B1 <= capacity and all four lists
+		together <= 2 * capacity keys.
+	"""
+	T1 = 0
+	T2 = 1
+	B1 = 2
+	B2 = 3
+
+	def __init__(self, capacity) -> None:
+		self.capacity = capacity
+		self.target = 0
+		self.lists = (DoublyLinkedList(), DoublyLinkedList(), DoublyLinkedList(), DoublyLinkedList())
+		self.sizes = [0, 0, 0, 0]
+		self.mapper = {}		# key -> node
+		self.locations = {}		# key -> list the node lives in
+
+	def _move(self, key, destination):
+		"""
+			detach the key's node and add it at the end (MRU) of destination
+		"""
+		node = self.mapper[key]
+		source = self.locations[key]
+		self.lists[source].detach_node(node)
+		self.sizes[source] -= 1
+		self.lists[destination].add_node_at_last(node)
+		self.sizes[destination] += 1
+		self.locations[key] = destination
+
+	def _drop_first(self, source):
+		"""
+			forget the LRU key of the list completely
+		"""
+		self._forget(self.lists[source].get_first_node().element)
+
+	def _forget(self, key):
+		node = self.mapper.pop(key)
+		location = self.locations.pop(key)
+		self.lists[location].detach_node(node)
+		self.sizes[location] -= 1
+
+	def _trim_ghosts(self):
+		sizes = self.sizes
+		while sizes[self.T1] + sizes[self.B1] > self.capacity and sizes[self.B1]:
+			self._drop_first(self.B1)
+		while sum(sizes) > 2 * self.capacity and sizes[self.B2]:
+			self._drop_first(self.B2)
+		while sum(sizes) > 2 * self.capacity and sizes[self.B1]:
+			self._drop_first(self.B1)
+
+	def key_accessed(self, key):
+		"""
+			a resident key moves to MRU of T2
+			a ghost key adapts target and comes back into T2
+			a new key goes to MRU of T1
+		"""
+		location = self.locations.get(key)
+		if location is None:
+			self.mapper[key] = self.lists[self.T1].add_element_at_last(key)
+			self.locations[key] = self.T1
+			self.sizes[self.T1] += 1
+			self._trim_ghosts()
+			return
+
+		if location == self.B1:
+			delta = max(self.sizes[self.B2] / self.sizes[self.B1], 1)
+			self.target = min(self.capacity, self.target + delta)
+		elif location == self.B2:
+			delta = max(self.sizes[self.B1] / self.sizes[self.B2], 1)
+			self.target = max(0, self.target - delta)
+		self._move(key, self.T2)
+
+	def evict_key(self):
+		"""
+			evict LRU of T1 if T1 is larger than target else LRU of T2
+			the evicted key is remembered in the matching ghost list
+		"""
+		t1_size = self.sizes[self.T1]
+		if t1_size and (t1_size > self.target or not self.sizes[self.T2]):
+			first = self.lists[self.T1].get_first_node()
+			self._move(first.element, self.B1)
+		elif self.sizes[self.T2]:
+			first = self.lists[self.T2].get_first_node()
+			self._move(first.element, self.B2)
+		else:
+			return None
+		self._trim_ghosts()
+		return first.element
+
+	def remove_key(self, key):
+		"""
+			forget a resident key without remembering it in a ghost list
+		"""
+		if self.locations.get(key) in (self.T1, self.T2):
+			self._forget(key)
@@ -0,0 +1,92 @@
+from algorithms.double_linked_list_node import DoubleLinkedListNode
+from algorithms.doubly_linked_list import DoublyLinkedList
+from algorithms.frequency_bucket import FrequencyBucket
+from cache.policies.eviction_policy import EvictionPolicy
+
+
+class LFUEvictionPolicy(EvictionPolicy):
+	"""
+		Least frequently used key is evicted, ties are broken by LRU.
+
+		Buckets of keys having the same frequency are kept in a linked list
+		sorted by frequency, so an access only moves a key to the neighbouring
+		bucket and eviction takes from the first bucket, both in O(1).
+
+		With dynamic_aging a new key starts at (frequency of last evicted key + 1)
+		instead of 1 (LFU-DA). Keys which were hot long ago stop gaining on new
+		keys and eventually become the least frequent and get evicted.
+	"""
+	def __init__(self, dynamic_aging=False) -> None:
+		self.buckets = DoublyLinkedList()
+		self.mapper = {}			# key -> node in bucket.keys
+		self.bucket_mapper = {}		# key -> node of bucket in self.buckets
+		self.dynamic_aging = dynamic_aging
+		self.age = 0
+
+	def _get_bucket_after(self, bucket_node, frequency):
+		"""
+			return the bucket for frequency which must come right after bucket_node
+			create it if it do not exist
+		"""
+		next_node = bucket_node.next
+		if next_node is not self.buckets.dummy_tail and next_node.element.frequency == frequency:
+			return next_node
+		new_bucket_node = DoubleLinkedListNode(FrequencyBucket(frequency))
+		self.buckets.add_node_after(bucket_node, new_bucket_node)
+		return new_bucket_node
+
+	def _remove_bucket_if_blank(self, bucket_node):
+		if bucket_node.element.keys.is_linked_list_blank():
+			self.buckets.detach_node(bucket_node)
+
+	def key_accessed(self, key):
+		"""
+			move the key to bucket of next frequency
+			a new key goes to the bucket of lowest frequency
+		"""
+		node = self.mapper.get(key)
+		if node is None:
+			frequency = self.age + 1
+			after = self.buckets.dummy_head
+			first = self.buckets.get_first_node()
+			if first is not None and first.element.frequency < frequency:
+				# resident keys are never less frequent than the age
+				after = first
+			bucket_node = self._get_bucket_after(after, frequency)
+			self.mapper[key] = bucket_node.element.keys.add_element_at_last(key)
+			self.bucket_mapper[key] = bucket_node
+			return
+
+		bucket_node = self.bucket_mapper[key]
+		next_bucket_node = self._get_bucket_after(bucket_node, bucket_node.element.frequency + 1)
+		bucket_node.element.keys.detach_node(node)
+		self._remove_bucket_if_blank(bucket_node)
+		next_bucket_node.element.keys.add_node_at_last(node)
+		self.bucket_mapper[key] = next_bucket_node
+
+	def evict_key(self):
+		"""
+			purge the least recently used key of the lowest frequency bucket
+		"""
+		bucket_node = self.buckets.get_first_node()
+		if not bucket_node:
+			return None
+		node = bucket_node.element.keys.get_first_node()
+		bucket_node.element.keys.detach_node(node)
+		self._remove_bucket_if_blank(bucket_node)
+		if self.dynamic_aging:
+			self.age = bucket_node.element.frequency
+		del self.mapper[node.element]
+		del self.bucket_mapper[node.element]
+		return node.element
+
+	def remove_key(self, key):
+		"""
+			remove the key from its bucket if it is tracked
+		"""
+		node = self.mapper.pop(key, None)
+		if not node:
+			return
+		bucket_node = self.bucket_mapper.pop(key)
+		bucket_node.element.keys.detach_node(node)
+		self._remove_bucket_if_blank(bucket_node)
@@ -31,4 +31,27 @@ class LRUEvictionPolicy(EvictionPolicy):
 		if not first:
 			return None
 		self.dll.detach_node(first)
+		del self.mapper[first.element]
 		return first.element
+
+	def remove_key(self, key):
+		"""
+			detach the key from linked list if it is tracked
+		"""
+		node = self.mapper.pop(key, None)
+		if node:
+			self.dll.detach_node(node)
+
+	def keys_accessed(self, keys):
+		"""
+			same as key_accessed for every key with the lookups done once
+		"""
+		mapper = self.mapper
+		dll = self.dll
+		for key in keys:
+			node = mapper.get(key)
+			if node:
+				dll.detach_node(node)
+				dll.add_node_at_last(node)
+			else:
+				mapper[key] = dll.add_element_at_last(key)
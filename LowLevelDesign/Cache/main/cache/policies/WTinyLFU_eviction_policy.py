@@ -0,0 +1,112 @@
+from algorithms.count_min_sketch import CountMinSketch
+from algorithms.doubly_linked_list import DoublyLinkedList
+from cache.policies.eviction_policy import EvictionPolicy
+
+
+class WTinyLFUEvictionPolicy(EvictionPolicy):
+	"""
+		Window TinyLFU eviction policy.
+
+		New keys enter a small LRU window. When the cache is full the LRU key of
+		the window is a candidate for the main region and the LRU key of the
+		main region is the victim. The candidate is only admitted if its
+		estimated frequency in a CountMinSketch beats the victim's, otherwise
+		the candidate itself is evicted. So one hit wonders pass through the
+		window without pushing valuable keys out of the main region.
+
+		The main region is a segmented LRU: admitted keys land in probation
+		and move to protected on their next access.
+	"""
+	WINDOW = 0
+	PROBATION = 1
+	PROTECTED = 2
+
+	def __init__(self, capacity, window_ratio=0.01, protected_ratio=0.8) -> None:
+		self.window_capacity = max(1, int(capacity * window_ratio))
+		main_capacity = max(1, capacity - self.window_capacity)
+		self.protected_capacity = max(1, int(main_capacity * protected_ratio))
+		self.sketch = CountMinSketch(capacity)
+		self.segments = (DoublyLinkedList(), DoublyLinkedList(), DoublyLinkedList())
+		self.sizes = [0, 0, 0]
+		self.mapper = {}		# key -> node
+		self.regions = {}		# key -> segment the node lives in
+
+	def _move(self, key, segment):
+		"""
+			detach the key's node and add it at the end of segment
+		"""
+		node = self.mapper[key]
+		current = self.regions[key]
+		self.segments[current].detach_node(node)
+		self.sizes[current] -= 1
+		self.segments[segment].add_node_at_last(node)
+		self.sizes[segment] += 1
+		self.regions[key] = segment
+
+	def _remove(self, node):
+		segment = self.regions.pop(node.element)
+		self.segments[segment].detach_node(node)
+		self.sizes[segment] -= 1
+		del self.mapper[node.element]
+		return node.element
+
+	def key_accessed(self, key):
+		"""
+			record the access in sketch and refresh the key's position
+			a key accessed in probation is promoted to protected
+		"""
+		self.sketch.increment(key)
+		segment = self.regions.get(key)
+		if segment is None:
+			self.mapper[key] = self.segments[self.WINDOW].add_element_at_last(key)
+			self.regions[key] = self.WINDOW
+			self.sizes[self.WINDOW] += 1
+			if self.sizes[self.WINDOW] > self.window_capacity:
+				# cache still has room, window overflow goes to main without a contest
+				first = self.segments[self.WINDOW].get_first_node()
+				self._move(first.element, self.PROBATION)
+		elif segment == self.PROBATION:
+			self._move(key, self.PROTECTED)
+			if self.sizes[self.PROTECTED] > self.protected_capacity:
+				demoted = self.segments[self.PROTECTED].get_first_node()
+				self._move(demoted.element, self.PROBATION)
+		else:
+			self._move(key, segment)
+
+	def _main_victim(self):
+		victim = self.segments[self.PROBATION].get_first_node()
+		if not victim:
+			victim = self.segments[self.PROTECTED].get_first_node()
+		return victim
+
+	def evict_key(self):
+		"""
+			evict either the window candidate or the main victim
+			whichever has the lower estimated frequency
+		"""
+		candidate = None
+		if self.sizes[self.WINDOW] >= self.window_capacity:
+			candidate = self.segments[self.WINDOW].get_first_node()
+		victim = self._main_victim()
+
+		if not candidate and not victim:
+			candidate = self.segments[self.WINDOW].get_first_node()
+			return self._remove(candidate) if candidate else None
+		if not victim:
+			return self._remove(candidate)
+		if not candidate:
+			return self._remove(victim)
+
+		if self.sketch.estimate(candidate.element) > self.sketch.estimate(victim.element):
+			evicted = self._remove(victim)
+			self._move(candidate.element, self.PROBATION)
+			return evicted
+		return self._remove(candidate)
+
+	def remove_key(self, key):
+		"""
+			remove the key from whichever segment it is in
+		"""
+		node = self.mapper.get(key)
+		if node:
+			self._remove(node)
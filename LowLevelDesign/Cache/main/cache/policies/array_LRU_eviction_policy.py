@@ -0,0 +1,48 @@
+from algorithms.array_linked_list import ArrayLinkedList
+from cache.policies.eviction_policy import EvictionPolicy
+
+
+class ArrayLRUEvictionPolicy(EvictionPolicy):
+	"""
+		LRU eviction policy backed by ArrayLinkedList.
+		Same behaviour as LRUEvictionPolicy but a key costs one slot id in
+		mapper and two integers in the link arrays instead of a node object.
+	"""
+	def __init__(self, capacity=16) -> None:
+		"""
+			capacity is only the initial size of link arrays, they grow if needed
+		"""
+		self.linked_list = ArrayLinkedList(capacity)
+		self.mapper = {}
+
+	def key_accessed(self, key):
+		"""
+			keep moving the recently accessed key to the end
+			Kepping the most recently used keys in the end
+		"""
+		slot = self.mapper.get(key)
+		if slot is None:
+			self.mapper[key] = self.linked_list.add_element_at_last(key)
+		else:
+			self.linked_list.move_node_to_last(slot)
+
+	def evict_key(self):
+		"""
+			purge the least recently used key and recycle its slot
+			least recently used key is in start of linked list
+		"""
+		first = self.linked_list.get_first_node()
+		if first is None:
+			return None
+		key = self.linked_list.get_element(first)
+		self.linked_list.remove_node(first)
+		del self.mapper[key]
+		return key
+
+	def remove_key(self, key):
+		"""
+			recycle the key's slot if it is tracked
+		"""
+		slot = self.mapper.pop(key, None)
+		if slot is not None:
+			self.linked_list.remove_node(slot)
@@ -12,4 +12,34 @@ class EvictionPolicy(ABC):
 
 	@abstractmethod
 	def evict_key(self):
-		pass
\ No newline at end of file
+		pass
+
+	@abstractmethod
+	def remove_key(self, key):
+		"""
+			forget the key without evicting it, e.g. when it expired
+		"""
+		pass
+
+	def keys_accessed(self, keys):
+		"""
+			batch version of key_accessed, policies can override it to do less work per key
+		"""
+		for key in keys:
+			self.key_accessed(key)
+
+	def evict_keys(self, count):
+		"""
+			evict up to count keys, returns the evicted keys
+		"""
+		evicted = []
+		for _ in range(count):
+			key = self.evict_key()
+			if key is None:
+				break
+			evicted.append(key)
+		return evicted
+
+	def remove_keys(self, keys):
+		for key in keys:
+			self.remove_key(key)
@@ -0,0 +1,37 @@
+from cache.policies.eviction_policy import EvictionPolicy
+
+
+class FlushOnEvictEvictionPolicy(EvictionPolicy):
+	"""
+		Decorator over another policy which calls before_evict(key) with the
+		chosen victim before handing it to the cache, e.g. to flush a dirty
+		entry so it is never evicted before reaching the backing store.
+		If before_evict raises, the key is given back to the policy and the
+		error is raised, so the entry stays in the cache and can be evicted
+		later.
+	"""
+	def __init__(self, policy: EvictionPolicy, before_evict) -> None:
+		self.policy = policy
+		self.before_evict = before_evict
+
+	def key_accessed(self, key):
+		self.policy.key_accessed(key)
+
+	def keys_accessed(self, keys):
+		self.policy.keys_accessed(keys)
+
+	def evict_key(self):
+		key = self.policy.evict_key()
+		if key is not None:
+			try:
+				self.before_evict(key)
+			except Exception:
+				self.policy.key_accessed(key)
+				raise
+		return key
+
+	def remove_key(self, key):
+		self.policy.remove_key(key)
+
+	def remove_keys(self, keys):
+		self.policy.remove_keys(keys)
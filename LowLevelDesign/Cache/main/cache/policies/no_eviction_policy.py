@@ -0,0 +1,16 @@
+from cache.policies.eviction_policy import EvictionPolicy
+
+
+class NoEvictionPolicy(EvictionPolicy):
+	"""
+		Policy for storages which make room by themselves, e.g. a storage
+		shared by several processes where one process can't know all the keys
+	"""
+	def key_accessed(self, key):
+		pass
+
+	def evict_key(self):
+		return None
+
+	def remove_key(self, key):
+		pass
@@ -0,0 +1,51 @@
+from cache.stats.latency_histogram import LatencyHistogram
+
+
+class CacheStats:
+	"""
+		Counters, latency histograms and gauges of a cache.
+		Cache only records into it when one is given, without stats the hot
+		path pays a single `is not None` check.
+	"""
+	COUNTERS = ('hits', 'misses', 'evictions', 'expirations', 'load_successes', 'load_failures')
+	OPERATIONS = ('get', 'put', 'get_many', 'put_many', 'delete_many', 'load')
+
+	def __init__(self) -> None:
+		for counter in self.COUNTERS:
+			setattr(self, counter, 0)
+		self.latencies = {operation: LatencyHistogram() for operation in self.OPERATIONS}
+		self.gauges = {}		# name -> callable returning current value
+
+	def record_latency(self, operation, nanoseconds):
+		self.latencies[operation].record(nanoseconds)
+
+	def register_gauge(self, name, read):
+		"""
+			read() is called on every snapshot, e.g. size or weight of storage
+		"""
+		self.gauges[name] = read
+
+	def merge(self, other):
+		"""
+			add counters and latencies of other stats to this one
+		"""
+		for counter in self.COUNTERS:
+			setattr(self, counter, getattr(self, counter) + getattr(other, counter))
+		for operation, histogram in other.latencies.items():
+			self.latencies[operation].merge(histogram)
+
+	def hit_ratio(self):
+		requests = self.hits + self.misses
+		return self.hits / requests if requests else 0.0
+
+	def snapshot(self):
+		"""
+			plain dict of all the stats, safe to serialize and export
+		"""
+		snapshot = {counter: getattr(self, counter) for counter in self.COUNTERS}
+		snapshot['hit_ratio'] = self.hit_ratio()
+		snapshot['latencies'] = {operation: histogram.snapshot()
+			for operation, histogram in self.latencies.items() if histogram.count}
+		for name, read in self.gauges.items():
+			snapshot[name] = read()
+		return snapshot
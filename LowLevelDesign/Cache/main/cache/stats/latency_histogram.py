@@ -0,0 +1,54 @@
+class LatencyHistogram:
+	"""
+		Histogram of latencies in nanoseconds with power of two buckets.
+		bucket i counts latencies in [2^(i-1), 2^i), so recording is one
+		bit_length and percentiles are reported as the bucket's upper bound.
+	"""
+	BUCKETS = 64
+
+	def __init__(self) -> None:
+		self.counts = [0] * self.BUCKETS
+		self.count = 0
+		self.total = 0
+		self.max = 0
+
+	def record(self, nanoseconds):
+		self.counts[min(nanoseconds.bit_length(), self.BUCKETS - 1)] += 1
+		self.count += 1
+		self.total += nanoseconds
+		if nanoseconds > self.max:
+			self.max = nanoseconds
+
+	def merge(self, other):
+		"""
+			add the recordings of other histogram to this one
+		"""
+		for bucket, count in enumerate(other.counts):
+			self.counts[bucket] += count
+		self.count += other.count
+		self.total += other.total
+		self.max = max(self.max, other.max)
+
+	def percentile(self, fraction):
+		"""
+			upper bound in nanoseconds of the latency below which fraction of recordings fall
+		"""
+		if not self.count:
+			return 0
+		rank = fraction * self.count
+		seen = 0
+		for bucket, count in enumerate(self.counts):
+			seen += count
+			if seen >= rank:
+				return min(1 << bucket, self.max)
+		return self.max
+
+	def snapshot(self):
+		return {
+			'count': self.count,
+			'mean_ns': self.total / self.count if self.count else 0,
+			'p50_ns': self.percentile(0.5),
+			'p90_ns': self.percentile(0.9),
+			'p99_ns': self.percentile(0.99),
+			'max_ns': self.max,
+		}
@@ -0,0 +1,162 @@
+import lzma
+import zlib
+
+from cache.exceptions.storage_full_exception import StorageFullException
+from cache.storage.storage import Storage
+
+
+class CompressedValue:
+	"""
+		compressed bytes of a str or bytes value as kept in the wrapped storage
+	"""
+	__slots__ = ('data', 'is_text')
+
+	def __init__(self, data, is_text) -> None:
+		self.data = data
+		self.is_text = is_text
+
+
+class CompressedStorage(Storage):
+	"""
+		Decorator over another storage compressing str and bytes values of at
+		least threshold bytes with zlib or lzma. A value whose compressed size
+		is more than max_ratio of its size doesn't compress well (already
+		compressed, random) and is kept as it is. Values are decompressed only
+		when read by get/get_many, eviction and removal never touch the data.
+		The encoding of a value refused for lack of room is kept, so the
+		retries of Cache.put after each eviction don't compress it again.
+
+		A weighted storage underneath weighs the compressed values, so more
+		entries fit in the same bytes. stats() reports the bytes values take
+		before and after compression to weigh memory saved against CPU spent.
+	"""
+	CODECS = {
+		'zlib': (lambda data, level: zlib.compress(data, 6 if level is None else level), zlib.decompress),
+		'lzma': (lambda data, level: lzma.compress(data, preset=level), lzma.decompress),
+	}
+
+	def __init__(self, storage: Storage, codec='zlib', threshold=1024, max_ratio=0.9, level=None) -> None:
+		if codec not in self.CODECS:
+			raise ValueError(f"unknown codec {codec}, use one of {', '.join(self.CODECS)}")
+		self.storage = storage
+		self.codec = codec
+		self.compress_data, self.decompress_data = self.CODECS[codec]
+		self.threshold = threshold
+		self.max_ratio = max_ratio
+		self.level = level
+		self.sizes = {}			# key -> (size of value, size stored) for str and bytes values
+		self.uncompressed_bytes = 0
+		self.stored_bytes = 0
+		self.compressed_entries = 0
+		self.incompressible = 0		# values not kept compressed because they didn't shrink enough
+		self.refused = None		# (key, value, encoding) of the last value the storage had no room for
+
+	def _encode(self, value):
+		"""
+			(value to store, size of value, size stored, incompressible)
+			sizes are None for other types
+		"""
+		if isinstance(value, str):
+			data = value.encode('utf-8')
+		elif isinstance(value, bytes):
+			data = value
+		else:
+			return value, None, None, False
+		if len(data) < self.threshold:
+			return value, len(data), len(data), False
+		compressed = self.compress_data(data, self.level)
+		if len(compressed) > len(data) * self.max_ratio:
+			return value, len(data), len(data), True
+		return CompressedValue(compressed, isinstance(value, str)), len(data), len(compressed), False
+
+	def _decode(self, stored):
+		if type(stored) is not CompressedValue:
+			return stored
+		data = self.decompress_data(stored.data)
+		return data.decode('utf-8') if stored.is_text else data
+
+	def _account(self, key, sizes):
+		"""
+			replace the sizes recorded for key, sizes is None when key is gone
+			or its value is neither str nor bytes
+		"""
+		old = self.sizes.pop(key, None)
+		if old is not None:
+			self.uncompressed_bytes -= old[0]
+			self.stored_bytes -= old[1]
+			if old[1] != old[0]:
+				self.compressed_entries -= 1
+		if sizes is not None and sizes[0] is not None:
+			self.sizes[key] = sizes
+			self.uncompressed_bytes += sizes[0]
+			self.stored_bytes += sizes[1]
+			if sizes[1] != sizes[0]:
+				self.compressed_entries += 1
+
+	def _stored(self, key, encoding):
+		"""
+			record an encoded value the wrapped storage accepted for key
+		"""
+		_, size, stored_size, incompressible = encoding
+		self._account(key, (size, stored_size))
+		if incompressible:
+			self.incompressible += 1
+
+	def add(self, key, value):
+		refused = self.refused
+		if refused is not None and refused[1] is value and refused[0] == key:
+			encoding = refused[2]
+		else:
+			encoding = self._encode(value)
+		try:
+			self.storage.add(key, encoding[0])
+		except StorageFullException:
+			self.refused = (key, value, encoding)
+			raise
+		self.refused = None
+		self._stored(key, encoding)
+
+	def remove(self, key):
+		self.storage.remove(key)
+		self._account(key, None)
+
+	def get(self, key):
+		return self._decode(self.storage.get(key))
+
+	def overflow(self, keys):
+		return self.storage.overflow(keys)
+
+	def add_many(self, items):
+		encoded = {key: self._encode(value) for key, value in items}
+		self.storage.add_many((key, encoding[0]) for key, encoding in encoded.items())
+		for key, encoding in encoded.items():
+			self._stored(key, encoding)
+
+	def remove_many(self, keys):
+		removed = self.storage.remove_many(keys)
+		for key in removed:
+			self._account(key, None)
+		return removed
+
+	def get_many(self, keys):
+		found, missing = self.storage.get_many(keys)
+		return {key: self._decode(stored) for key, stored in found.items()}, missing
+
+	def size(self):
+		return self.storage.size()
+
+	def weight(self):
+		return self.storage.weight()
+
+	def stats(self):
+		"""
+			bytes of str and bytes values before and after compression
+		"""
+		return {
+			'codec': self.codec,
+			'compressed_entries': self.compressed_entries,
+			'incompressible': self.incompressible,
+			'uncompressed_bytes': self.uncompressed_bytes,
+			'stored_bytes': self.stored_bytes,
+			'ratio': self.stored_bytes / self.uncompressed_bytes if self.uncompressed_bytes else 1.0,
+		}
@@ -0,0 +1,45 @@
+import sys
+import types
+
+# shared objects reached through references, not owned by the value
+SHARED = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType)
+
+
+def deep_size(obj):
+	"""
+		estimate the bytes used by obj and everything it refers to
+		follows builtin containers, instance __dict__ and __slots__
+		objects referred to more than once are counted once, classes,
+		modules and functions are shared and not counted
+	"""
+	seen = set()
+	size = 0
+	stack = [obj]
+	while stack:
+		current = stack.pop()
+		if id(current) in seen:
+			continue
+		seen.add(id(current))
+		if isinstance(current, SHARED):
+			continue
+		size += sys.getsizeof(current)
+		if isinstance(current, (str, bytes, bytearray, int, float, bool, type(None))):
+			continue
+		if isinstance(current, dict):
+			stack.extend(current.keys())
+			stack.extend(current.values())
+		elif isinstance(current, (list, tuple, set, frozenset)):
+			stack.extend(current)
+		if hasattr(current, '__dict__'):
+			stack.append(vars(current))
+		for slot in getattr(type(current), '__slots__', ()):
+			if hasattr(current, slot):
+				stack.append(getattr(current, slot))
+	return size
+
+
+def default_weigher(key, value):
+	"""
+		weight of an entry is the deep size of its key and value
+	"""
+	return deep_size(key) + deep_size(value)
@@ -8,6 +8,9 @@ class HashMapBasedStorage(Storage):
 		self.capacity = capacity
 		self.storage = {}		# python hashmap
 
+	def size(self):
+		return len(self.storage)
+
 	def is_storage_full(self):
 		return len(self.storage) == self.capacity
 
@@ -16,7 +19,7 @@ class HashMapBasedStorage(Storage):
 			add the key to storage and assign a value
 			if the key is alredy existing then updates the value
 		"""
-		if self.is_storage_full():
+		if key not in self.storage and self.is_storage_full():
 			raise StorageFullException("Capacity Full")
 		self.storage[key] = value
 	
@@ -36,3 +39,46 @@ class HashMapBasedStorage(Storage):
 		if key not in self.storage:
 			raise NotFoundException(f"{key} dosen't exist in cache")
 		return self.storage.get(key)
+
+	def overflow(self, keys):
+		"""
+			number of entries to remove so that all keys fit
+		"""
+		storage = self.storage
+		new_keys = sum(1 for key in set(keys) if key not in storage)
+		return max(0, len(storage) + new_keys - self.capacity)
+
+	def add_many(self, items):
+		"""
+			add all (key, value) pairs at once or none of them if they don't fit
+		"""
+		items = dict(items)
+		if self.overflow(items):
+			raise StorageFullException("Capacity Full")
+		self.storage.update(items)
+
+	def remove_many(self, keys):
+		"""
+			remove the keys which exist, return the removed keys
+		"""
+		storage = self.storage
+		removed = []
+		for key in keys:
+			if key in storage:
+				del storage[key]
+				removed.append(key)
+		return removed
+
+	def get_many(self, keys):
+		"""
+			return dict of found keys with values and list of missing keys
+		"""
+		storage = self.storage
+		found = {}
+		missing = []
+		for key in keys:
+			if key in storage:
+				found[key] = storage[key]
+			else:
+				missing.append(key)
+		return found, missing
@@ -0,0 +1,304 @@
+import mmap
+import os
+import struct
+import zlib
+
+from cache.exceptions.corrupted_storage_exception import CorruptedStorageException
+from cache.exceptions.entry_too_large_exception import EntryTooLargeException
+from cache.exceptions.not_found_exception import NotFoundException
+from cache.exceptions.storage_full_exception import StorageFullException
+from cache.storage.storage import Storage
+
+
+class MmapStorage(Storage):
+	"""
+		Hash table kept in a memory mapped file, so a restarted process maps
+		the file and serves hits at once without loading anything.
+
+		layout: header | index of slot_count slots | data region
+		header: magic, version, geometry, end of data, counters, clean flag, crc32
+		slot: state (1 byte) | crc32 of key (4) | offset of record in data (8)
+		record: key length (2) | value length (4) | crc32 of key + value (4) | key | value
+
+		Keys and values are bytes. The index is open addressing with linear
+		probing on crc32 of the key (stable between runs unlike hash()).
+		Records are only appended, an update or remove leaves the old record
+		as garbage which compact() reclaims by rewriting live records to a
+		new file that replaces the old one. add compacts by itself when the
+		data region or the index runs out of room.
+
+		The header is written on flush and close only. A file not closed
+		cleanly is checked on open: records appended after the header's end
+		of data are recovered while their crc matches and index slots pointing
+		to missing or corrupted records are dropped.
+	"""
+	MAGIC = b'LLDMMAP1'
+	VERSION = 1
+	HEADER = struct.Struct('<8sIQQQQQQB')
+	HEADER_CRC = struct.Struct('<I')
+	HEADER_SIZE = 4096
+	SLOT = struct.Struct('<BIQ')
+	RECORD = struct.Struct('<HII')
+	EMPTY = 0
+	USED = 1
+	TOMBSTONE = 2
+	# live entries are kept below these limits so that a compaction always
+	# reclaims a good part of the file and is not needed again soon
+	MAX_LOAD = 0.75
+	MAX_USED_SLOTS = 0.9
+	MAX_LIVE = 0.9
+
+	def __init__(self, path, slot_count=1 << 16, data_capacity=64 << 20) -> None:
+		"""
+			open the file at path, or create it with the given geometry
+			geometry of an existing file comes from its header
+		"""
+		self.path = path
+		compact_path = path + '.compact'
+		if os.path.exists(compact_path):
+			os.remove(compact_path)		# compaction interrupted, original file is intact
+		if os.path.exists(path):
+			self._open()
+		else:
+			self._create(path, slot_count, data_capacity)
+			self._open()
+
+	@classmethod
+	def _create(cls, path, slot_count, data_capacity):
+		"""
+			write an empty, cleanly closed file
+		"""
+		size = cls.HEADER_SIZE + slot_count * cls.SLOT.size + data_capacity
+		with open(path, 'wb') as new_file:
+			new_file.truncate(size)
+			header = cls.HEADER.pack(cls.MAGIC, cls.VERSION, slot_count, data_capacity, 0, 0, 0, 0, 1)
+			new_file.write(header + cls.HEADER_CRC.pack(zlib.crc32(header)))
+
+	def _open(self):
+		self.file = open(self.path, 'r+b')
+		self.map = mmap.mmap(self.file.fileno(), 0)
+		header = self.map[:self.HEADER.size]
+		crc, = self.HEADER_CRC.unpack_from(self.map, self.HEADER.size)
+		magic, version, self.slot_count, self.data_capacity, self.data_end, self.live_bytes, \
+			self.entry_count, self.tombstone_count, clean = self.HEADER.unpack(header)
+		if magic != self.MAGIC or version != self.VERSION:
+			raise CorruptedStorageException(f"{self.path} is not a version {self.VERSION} MmapStorage file")
+		if zlib.crc32(header) != crc:
+			raise CorruptedStorageException(f"{self.path} header checksum mismatch")
+		self.index_offset = self.HEADER_SIZE
+		self.data_offset = self.index_offset + self.slot_count * self.SLOT.size
+		if len(self.map) != self.data_offset + self.data_capacity:
+			raise CorruptedStorageException(f"{self.path} size doesn't match its header")
+		if not clean:
+			self._recover()
+		# until closed cleanly the file is treated as crashed
+		self._write_header(clean=0)
+
+	def _write_header(self, clean):
+		header = self.HEADER.pack(self.MAGIC, self.VERSION, self.slot_count, self.data_capacity, self.data_end,
+			self.live_bytes, self.entry_count, self.tombstone_count, clean)
+		self.map[:self.HEADER.size + self.HEADER_CRC.size] = header + self.HEADER_CRC.pack(zlib.crc32(header))
+		self.map.flush()
+
+	def _read_record(self, offset):
+		"""
+			(key, value) of the record at offset of data region, None if it is not valid
+		"""
+		if offset + self.RECORD.size > self.data_capacity:
+			return None
+		start = self.data_offset + offset
+		key_length, value_length, crc = self.RECORD.unpack_from(self.map, start)
+		body_start = start + self.RECORD.size
+		end = body_start + key_length + value_length
+		if end > self.data_offset + self.data_capacity:
+			return None
+		body = self.map[body_start:end]
+		if zlib.crc32(body) != crc:
+			return None
+		return body[:key_length], body[key_length:]
+
+	def _recover(self):
+		"""
+			bring counters and index back in line with the data after a crash
+		"""
+		while self.data_end < self.data_capacity:
+			record = self._read_record(self.data_end)
+			if record is None or not record[0]:
+				break
+			self.data_end += self.RECORD.size + len(record[0]) + len(record[1])
+
+		self.live_bytes = 0
+		self.entry_count = 0
+		self.tombstone_count = 0
+		for slot in range(self.slot_count):
+			position = self.index_offset + slot * self.SLOT.size
+			state, key_hash, offset = self.SLOT.unpack_from(self.map, position)
+			if state == self.TOMBSTONE:
+				self.tombstone_count += 1
+			if state != self.USED:
+				continue
+			record = None if offset >= self.data_end else self._read_record(offset)
+			if record is None or zlib.crc32(record[0]) != key_hash:
+				self.SLOT.pack_into(self.map, position, self.TOMBSTONE, 0, 0)
+				self.tombstone_count += 1
+				continue
+			self.entry_count += 1
+			self.live_bytes += self.RECORD.size + len(record[0]) + len(record[1])
+
+	def _probe(self, key, key_hash):
+		"""
+			(slot of key or -1, first reusable slot or -1)
+		"""
+		slot_count = self.slot_count
+		slot = key_hash % slot_count
+		reusable = -1
+		for _ in range(slot_count):
+			state, slot_hash, offset = self.SLOT.unpack_from(self.map, self.index_offset + slot * self.SLOT.size)
+			if state == self.EMPTY:
+				return -1, slot if reusable == -1 else reusable
+			if state == self.TOMBSTONE:
+				if reusable == -1:
+					reusable = slot
+			elif slot_hash == key_hash and self._record_key(offset) == key:
+				return slot, reusable
+			slot = (slot + 1) % slot_count
+		return -1, reusable
+
+	def _record_key(self, offset):
+		start = self.data_offset + offset
+		key_length = self.RECORD.unpack_from(self.map, start)[0]
+		key_start = start + self.RECORD.size
+		return self.map[key_start:key_start + key_length]
+
+	def _slot_record(self, slot):
+		offset = self.SLOT.unpack_from(self.map, self.index_offset + slot * self.SLOT.size)[2]
+		return offset, self._read_record(offset)
+
+	def _check_key(self, key):
+		if not isinstance(key, bytes):
+			raise TypeError(f"key should be bytes, got {type(key).__name__}")
+		if not key or len(key) > 0xFFFF:
+			raise EntryTooLargeException(f"key length should be in 1..65535, got {len(key)}")
+
+	def add(self, key, value):
+		"""
+			append a record for key and point its slot to it
+			compacts when garbage would make room, else raises StorageFullException
+		"""
+		self._check_key(key)
+		if not isinstance(value, bytes):
+			raise TypeError(f"value should be bytes, got {type(value).__name__}")
+		record_size = self.RECORD.size + len(key) + len(value)
+		if record_size > self.data_capacity:
+			raise EntryTooLargeException(f"{key} needs {record_size} bytes, data region is {self.data_capacity}")
+		key_hash = zlib.crc32(key)
+		slot, reusable = self._probe(key, key_hash)
+		if slot == -1 and self.entry_count + 1 > self.slot_count * self.MAX_LOAD:
+			raise StorageFullException("Capacity Full, index slots are used up")
+		replaced_size = 0		# an update frees the record it replaces
+		if slot != -1:
+			_, old = self._slot_record(slot)
+			replaced_size = self.RECORD.size + len(old[0]) + len(old[1])
+		if self.live_bytes - replaced_size + record_size > self.data_capacity * self.MAX_LIVE:
+			raise StorageFullException("Capacity Full, data region is used up")
+		if self.data_end + record_size > self.data_capacity \
+			or self.entry_count + self.tombstone_count + 1 > self.slot_count * self.MAX_USED_SLOTS:
+			# the replaced record is left out, the new one may only fit without it
+			self.compact(exclude=key if slot != -1 else None)
+			slot, reusable = self._probe(key, key_hash)
+			replaced_size = 0
+
+		offset = self.data_end
+		start = self.data_offset + offset
+		self.RECORD.pack_into(self.map, start, len(key), len(value), zlib.crc32(key + value))
+		body_start = start + self.RECORD.size
+		self.map[body_start:body_start + len(key) + len(value)] = key + value
+		self.data_end += record_size
+		self.live_bytes += record_size
+
+		if slot == -1:
+			slot = reusable
+			if self.SLOT.unpack_from(self.map, self.index_offset + slot * self.SLOT.size)[0] == self.TOMBSTONE:
+				self.tombstone_count -= 1
+			self.entry_count += 1
+		else:
+			self.live_bytes -= replaced_size
+		self.SLOT.pack_into(self.map, self.index_offset + slot * self.SLOT.size, self.USED, key_hash, offset)
+
+	def remove(self, key):
+		"""
+			remove the key from storage
+			throw exception if key not found
+		"""
+		self._check_key(key)
+		slot, _ = self._probe(key, zlib.crc32(key))
+		if slot == -1:
+			raise NotFoundException(f"{key} do not exists in cache")
+		_, record = self._slot_record(slot)
+		self.live_bytes -= self.RECORD.size + len(record[0]) + len(record[1])
+		self.SLOT.pack_into(self.map, self.index_offset + slot * self.SLOT.size, self.TOMBSTONE, 0, 0)
+		self.entry_count -= 1
+		self.tombstone_count += 1
+
+	def get(self, key):
+		"""
+			return the value for key, raise exception if not found
+		"""
+		self._check_key(key)
+		slot, _ = self._probe(key, zlib.crc32(key))
+		if slot == -1:
+			raise NotFoundException(f"{key} dosen't exist in cache")
+		offset = self.SLOT.unpack_from(self.map, self.index_offset + slot * self.SLOT.size)[2]
+		start = self.data_offset + offset
+		key_length, value_length, _ = self.RECORD.unpack_from(self.map, start)
+		value_start = start + self.RECORD.size + key_length
+		return self.map[value_start:value_start + value_length]
+
+	def keys(self):
+		"""
+			all stored keys, e.g. to tell an eviction policy about them after a restart
+		"""
+		for slot in range(self.slot_count):
+			state, _, offset = self.SLOT.unpack_from(self.map, self.index_offset + slot * self.SLOT.size)
+			if state == self.USED:
+				yield self._record_key(offset)
+
+	def size(self):
+		return self.entry_count
+
+	def weight(self):
+		return self.live_bytes
+
+	def compact(self, exclude=None):
+		"""
+			rewrite live records into a new file without garbage and tombstones
+			the new file replaces the old one atomically with os.replace
+			the record of key exclude is left out, add uses it for the key it replaces
+		"""
+		compact_path = self.path + '.compact'
+		self._create(compact_path, self.slot_count, self.data_capacity)
+		compacted = MmapStorage(compact_path)
+		for slot in range(self.slot_count):
+			state, _, offset = self.SLOT.unpack_from(self.map, self.index_offset + slot * self.SLOT.size)
+			if state == self.USED:
+				key, value = self._read_record(offset)
+				if key != exclude:
+					compacted.add(key, value)
+		compacted.close()
+		self._close_map()
+		os.replace(compact_path, self.path)
+		self._open()
+
+	def flush(self):
+		"""
+			write the header and sync the file, after this a crash loses nothing
+		"""
+		self._write_header(clean=0)
+
+	def _close_map(self):
+		self.map.close()
+		self.file.close()
+
+	def close(self):
+		self._write_header(clean=1)
+		self._close_map()
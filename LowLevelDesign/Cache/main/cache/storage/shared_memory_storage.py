@@ -0,0 +1,212 @@
+import multiprocessing
+import os
+import struct
+import zlib
+from multiprocessing import shared_memory
+
+from cache.exceptions.entry_too_large_exception import EntryTooLargeException
+from cache.exceptions.not_found_exception import NotFoundException
+from cache.storage.storage import Storage
+
+
+class SharedMemoryStorage(Storage):
+	"""
+		Hash table living in a multiprocessing.shared_memory segment so that
+		every worker process on a host reads and writes the same entries.
+
+		Keys and values are byte strings of bounded size. The table is split
+		in buckets of slots_per_bucket fixed size slots, a key hashes (crc32,
+		which unlike hash() is the same in every process) to one bucket and
+		is searched only there. Bucket i is guarded by lock i % len(locks),
+		the locks are multiprocessing.Lock so they must be created before
+		the workers and handed to them (fork or Process args).
+
+		Every slot has a one byte tag, 0 for an empty slot else a fingerprint
+		of the key's hash. Tags of a bucket are contiguous so a lookup finds
+		candidate slots with bytes.find and compares only their keys.
+
+		A full bucket makes room by itself with CLOCK: get sets a slot's
+		referenced bit, add replaces the first slot found without it. No
+		single process knows every key, so use it with NoEvictionPolicy.
+
+		layout: header | clock hand per bucket | tag per slot | slots
+		slot: referenced (1 byte) | key length (2) | value length (4) | key | value
+	"""
+	MAGIC = b'LLDSHM01'
+	HEADER = struct.Struct('<8sIIII')
+	SLOT_HEADER = struct.Struct('<BHI')
+	EMPTY = 0
+
+	def __init__(self, bucket_count=1024, slots_per_bucket=8, max_key_size=64, max_value_size=1024,
+		name=None, locks=None, lock_count=64) -> None:
+		"""
+			create a new segment, other processes use attach or receive this object pickled
+		"""
+		if slots_per_bucket > 255:
+			raise ValueError("slots_per_bucket can be at most 255")
+		self.bucket_count = bucket_count
+		self.slots_per_bucket = slots_per_bucket
+		self.max_key_size = max_key_size
+		self.max_value_size = max_value_size
+		self.locks = locks or [multiprocessing.Lock() for _ in range(lock_count)]
+		size = self._layout()
+		self.memory = shared_memory.SharedMemory(name=name, create=True, size=size)
+		self.buffer = self.memory.buf
+		self.HEADER.pack_into(self.buffer, 0, self.MAGIC, bucket_count, slots_per_bucket, max_key_size, max_value_size)
+		self.owner_pid = os.getpid()
+
+	def _layout(self):
+		"""
+			compute offsets from the table geometry, return total size in bytes
+		"""
+		self.hands_offset = self.HEADER.size
+		self.tags_offset = self.hands_offset + self.bucket_count
+		self.slots_offset = self.tags_offset + self.bucket_count * self.slots_per_bucket
+		self.slot_size = self.SLOT_HEADER.size + self.max_key_size + self.max_value_size
+		self.key_start = self.SLOT_HEADER.size
+		self.value_start = self.key_start + self.max_key_size
+		return self.slots_offset + self.bucket_count * self.slots_per_bucket * self.slot_size
+
+	@classmethod
+	def attach(cls, name, locks):
+		"""
+			open an existing segment created by another process with the same locks
+		"""
+		storage = cls.__new__(cls)
+		storage._attach(name, locks)
+		return storage
+
+	def _attach(self, name, locks):
+		self.memory = shared_memory.SharedMemory(name=name)
+		self.buffer = self.memory.buf
+		magic, self.bucket_count, self.slots_per_bucket, self.max_key_size, self.max_value_size = \
+			self.HEADER.unpack_from(self.buffer, 0)
+		if magic != self.MAGIC:
+			raise ValueError(f"shared memory {name} is not a SharedMemoryStorage")
+		self._layout()
+		self.locks = locks
+		self.owner_pid = None
+
+	def __getstate__(self):
+		return {'name': self.memory.name, 'locks': self.locks}
+
+	def __setstate__(self, state):
+		self._attach(state['name'], state['locks'])
+
+	def _locate(self, key):
+		"""
+			bucket of the key and the tag identifying it in the bucket
+		"""
+		if not isinstance(key, bytes):
+			raise TypeError(f"key should be bytes, got {type(key).__name__}")
+		key_hash = zlib.crc32(key)
+		return key_hash % self.bucket_count, (key_hash >> 24) | 1
+
+	def _slot_offset(self, bucket, index):
+		return self.slots_offset + (bucket * self.slots_per_bucket + index) * self.slot_size
+
+	def _find(self, bucket, tag, key):
+		"""
+			index of the slot holding key in bucket, -1 if not there
+		"""
+		buffer = self.buffer
+		tags_start = self.tags_offset + bucket * self.slots_per_bucket
+		tags = buffer[tags_start:tags_start + self.slots_per_bucket].tobytes()
+		tag = bytes((tag,))
+		key_start = self.key_start
+		index = tags.find(tag)
+		while index != -1:
+			offset = self._slot_offset(bucket, index)
+			key_length = self.SLOT_HEADER.unpack_from(buffer, offset)[1]
+			if key_length == len(key) and buffer[offset + key_start:offset + key_start + key_length] == key:
+				return index
+			index = tags.find(tag, index + 1)
+		return -1
+
+	def _free_slot(self, bucket):
+		"""
+			index of an empty slot, or of the CLOCK victim when the bucket is full
+		"""
+		buffer = self.buffer
+		tags_start = self.tags_offset + bucket * self.slots_per_bucket
+		index = buffer[tags_start:tags_start + self.slots_per_bucket].tobytes().find(self.EMPTY)
+		if index != -1:
+			return index
+		hand_offset = self.hands_offset + bucket
+		hand = buffer[hand_offset]
+		while True:
+			offset = self._slot_offset(bucket, hand)
+			index = hand
+			hand = (hand + 1) % self.slots_per_bucket
+			if buffer[offset]:
+				buffer[offset] = 0		# second chance
+			else:
+				buffer[hand_offset] = hand
+				return index
+
+	def add(self, key, value):
+		"""
+			add or update key, a full bucket replaces its CLOCK victim
+		"""
+		if not isinstance(value, bytes):
+			raise TypeError(f"value should be bytes, got {type(value).__name__}")
+		if len(key) > self.max_key_size or len(value) > self.max_value_size:
+			raise EntryTooLargeException(f"key or value larger than {self.max_key_size}/{self.max_value_size} bytes")
+		bucket, tag = self._locate(key)
+		buffer = self.buffer
+		with self.locks[bucket % len(self.locks)]:
+			index = self._find(bucket, tag, key)
+			if index == -1:
+				index = self._free_slot(bucket)
+				offset = self._slot_offset(bucket, index)
+				buffer[offset + self.key_start:offset + self.key_start + len(key)] = key
+				buffer[self.tags_offset + bucket * self.slots_per_bucket + index] = tag
+			else:
+				offset = self._slot_offset(bucket, index)
+			buffer[offset + self.value_start:offset + self.value_start + len(value)] = value
+			self.SLOT_HEADER.pack_into(buffer, offset, 0, len(key), len(value))
+
+	def remove(self, key):
+		"""
+			remove the key from storage
+			throw exception if key not found
+		"""
+		bucket, tag = self._locate(key)
+		with self.locks[bucket % len(self.locks)]:
+			index = self._find(bucket, tag, key)
+			if index == -1:
+				raise NotFoundException(f"{key} do not exists in cache")
+			self.buffer[self.tags_offset + bucket * self.slots_per_bucket + index] = self.EMPTY
+
+	def get(self, key):
+		"""
+			return the value for key, raise exception if not found
+		"""
+		bucket, tag = self._locate(key)
+		buffer = self.buffer
+		with self.locks[bucket % len(self.locks)]:
+			index = self._find(bucket, tag, key)
+			if index == -1:
+				raise NotFoundException(f"{key} dosen't exist in cache")
+			offset = self._slot_offset(bucket, index)
+			buffer[offset] = 1		# referenced
+			value_length = self.SLOT_HEADER.unpack_from(buffer, offset)[2]
+			value_start = offset + self.value_start
+			return buffer[value_start:value_start + value_length].tobytes()
+
+	def size(self):
+		"""
+			number of used slots, read without locks so it is approximate under writes
+		"""
+		tags = self.buffer[self.tags_offset:self.slots_offset].tobytes()
+		return len(tags) - tags.count(self.EMPTY)
+
+	def close(self):
+		"""
+			detach this process, the creating process also destroys the segment
+			(a forked worker has a copy of this object but is not the creator)
+		"""
+		self.buffer.release()
+		self.memory.close()
+		if self.owner_pid == os.getpid():
+			self.memory.unlink()
@@ -15,3 +15,55 @@ class Storage(ABC):
 	@abstractmethod
 	def get(self, key):
 		pass
+
+	def overflow(self, keys):
+		"""
+			number of entries to remove so that all keys fit
+			None if the storage can't tell, then callers add keys one by one
+		"""
+		return None
+
+	def add_many(self, items):
+		"""
+			add (key, value) pairs, raise StorageFullException if they don't fit
+		"""
+		for key, value in items:
+			self.add(key, value)
+
+	def remove_many(self, keys):
+		"""
+			remove the keys which exist, return the removed keys
+		"""
+		removed = []
+		for key in keys:
+			try:
+				self.remove(key)
+				removed.append(key)
+			except NotFoundException:
+				pass
+		return removed
+
+	def get_many(self, keys):
+		"""
+			return dict of found keys with values and list of missing keys
+		"""
+		found = {}
+		missing = []
+		for key in keys:
+			try:
+				found[key] = self.get(key)
+			except NotFoundException:
+				missing.append(key)
+		return found, missing
+
+	def size(self):
+		"""
+			number of entries, None if the storage can't tell
+		"""
+		return None
+
+	def weight(self):
+		"""
+			bytes used by entries, None if the storage doesn't weigh entries
+		"""
+		return None
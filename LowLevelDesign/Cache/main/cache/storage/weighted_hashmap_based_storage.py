@@ -0,0 +1,69 @@
+from cache.exceptions.entry_too_large_exception import EntryTooLargeException
+from cache.exceptions.not_found_exception import NotFoundException
+from cache.exceptions.storage_full_exception import StorageFullException
+from cache.storage.deep_size import default_weigher
+from cache.storage.storage import Storage
+
+
+class WeightedHashMapBasedStorage(Storage):
+	"""
+		Hashmap storage whose capacity is a budget of bytes instead of entries.
+		weigher(key, value) returns the bytes of an entry, by default the deep
+		size of key and value. An entry heavier than max_entry_bytes is refused
+		with EntryTooLargeException before anything is evicted for it.
+		The weight of an entry refused for lack of room is kept, so the
+		retries of Cache.put after each eviction don't weigh it again.
+	"""
+	def __init__(self, max_bytes, weigher=default_weigher, max_entry_bytes=None) -> None:
+		self.max_bytes = max_bytes
+		self.weigher = weigher
+		self.max_entry_bytes = max_bytes if max_entry_bytes is None else min(max_entry_bytes, max_bytes)
+		self.storage = {}		# key -> value
+		self.weights = {}		# key -> weight of the entry
+		self.total_weight = 0
+		self.refused = None		# (key, value, weight) of the last entry without room
+
+	def size(self):
+		return len(self.storage)
+
+	def weight(self):
+		return self.total_weight
+
+	def add(self, key, value):
+		"""
+			add the key to storage and assign a value
+			raise StorageFullException if the budget has no room for it
+		"""
+		refused = self.refused
+		if refused is not None and refused[1] is value and refused[0] == key:
+			entry_weight = refused[2]
+		else:
+			entry_weight = self.weigher(key, value)
+		if entry_weight > self.max_entry_bytes:
+			raise EntryTooLargeException(f"{key} weighs {entry_weight} bytes, limit is {self.max_entry_bytes}")
+		new_weight = self.total_weight - self.weights.get(key, 0) + entry_weight
+		if new_weight > self.max_bytes:
+			self.refused = (key, value, entry_weight)
+			raise StorageFullException(f"Capacity Full, {new_weight - self.max_bytes} bytes short")
+		self.refused = None
+		self.storage[key] = value
+		self.weights[key] = entry_weight
+		self.total_weight = new_weight
+
+	def remove(self, key):
+		"""
+			remove the key from storage
+			throw exception if key not found
+		"""
+		if key not in self.storage:
+			raise NotFoundException(f"{key} do not exists in cache")
+		del self.storage[key]
+		self.total_weight -= self.weights.pop(key)
+
+	def get(self, key):
+		"""
+			return the value for key, raise exception if not found
+		"""
+		if key not in self.storage:
+			raise NotFoundException(f"{key} dosen't exist in cache")
+		return self.storage.get(key)
@@ -0,0 +1,133 @@
+import threading
+
+from cache.policies.flush_on_evict_eviction_policy import FlushOnEvictEvictionPolicy
+
+
+class WriteBehindCache:
+	"""
+		Cache whose writes reach a BackingStore later, in batches.
+
+		put and delete change the cache right away and record the key as dirty.
+		Repeated writes to a key only keep the latest value, so a batch holds
+		each key once. A background thread flushes the dirty keys every
+		flush_interval seconds, or sooner when batch_size keys are dirty.
+
+		The cache's eviction policy is wrapped so that picking a dirty key as
+		victim first flushes the dirty keys: an entry is never evicted before
+		it is written. The dirty keys are swapped out under the cache lock and
+		written to the store outside it, so reads and writes don't wait for
+		the store. A second lock held during the write keeps batches reaching
+		the store in the order they were taken. A batch the store refused is
+		kept and written again, merged under newer values, by the next flush.
+	"""
+	DELETED = object()
+
+	def __init__(self, cache, backing_store, flush_interval=1.0, batch_size=500) -> None:
+		self.cache = cache
+		self.backing_store = backing_store
+		self.flush_interval = flush_interval
+		self.batch_size = batch_size
+		self.dirty = {}		# key -> latest value or DELETED
+		self.writing = {}		# batch being written to the store
+		self.failed = {}		# batch the store refused, guarded by flush_lock
+		self.lock = threading.RLock()
+		self.flush_lock = threading.Lock()
+		self.wake_up = threading.Event()
+		self.closed = False
+		self.last_error = None
+		cache.eviction_policy = FlushOnEvictEvictionPolicy(cache.eviction_policy, self._before_evict)
+		self.worker = threading.Thread(target=self._run, daemon=True)
+		self.worker.start()
+
+	def put(self, key, value, ttl=None):
+		with self.lock:
+			self._check_open()
+			self.cache.put(key, value, ttl)
+			self._mark_dirty(key, value)
+
+	def get(self, key):
+		with self.lock:
+			return self.cache.get(key)
+
+	def delete(self, key):
+		with self.lock:
+			self._check_open()
+			self.cache.delete_many([key])
+			self._mark_dirty(key, self.DELETED)
+
+	def _check_open(self):
+		if self.closed:
+			raise RuntimeError("write behind cache is closed")
+
+	def _mark_dirty(self, key, value):
+		self.dirty[key] = value
+		if len(self.dirty) >= self.batch_size:
+			self.wake_up.set()
+
+	def _before_evict(self, key):
+		"""
+			called under lock by the eviction policy with the key about to be evicted
+		"""
+		if key in self.writing:
+			# its batch is being written by another thread, wait for it, a
+			# failed batch leaves the key in failed for the flush below
+			with self.flush_lock:
+				pass
+		if key in self.dirty or key in self.failed:
+			self.flush()
+
+	def flush(self):
+		"""
+			write all dirty keys to the backing store as one batch
+			if the store fails the keys stay dirty and the error is raised
+		"""
+		with self.lock:
+			if not self.dirty and not self.failed:
+				return
+			batch = self.dirty
+			self.dirty = {}
+			# taken before the cache lock is released, batches are written in order
+			self.flush_lock.acquire()
+			self.writing = batch
+		try:
+			if self.failed:
+				self.failed.update(batch)
+				batch = self.failed
+				self.failed = {}
+			writes = {key: value for key, value in batch.items() if value is not self.DELETED}
+			deletes = [key for key, value in batch.items() if value is self.DELETED]
+			try:
+				if writes:
+					self.backing_store.write_many(writes)
+				if deletes:
+					self.backing_store.delete_many(deletes)
+			except Exception:
+				self.failed = batch
+				raise
+		finally:
+			self.writing = {}
+			self.flush_lock.release()
+
+	def _run(self):
+		while not self.closed:
+			self.wake_up.wait(self.flush_interval)
+			self.wake_up.clear()
+			try:
+				self.flush()
+				self.last_error = None
+			except Exception as e:
+				# keys stay dirty, next round tries again
+				self.last_error = e
+
+	def close(self):
+		"""
+			stop the background thread, flush what is dirty and close the store
+		"""
+		with self.lock:
+			if self.closed:
+				return
+			self.closed = True
+		self.wake_up.set()
+		self.worker.join()
+		self.flush()
+		self.backing_store.close()
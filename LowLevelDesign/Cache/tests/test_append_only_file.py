@@ -0,0 +1,66 @@
+import os
+import tempfile
+import unittest
+
+from database.append_only_file import AppendOnlyFile
+from database.exceptions.corrupted_append_only_file_exception import CorruptedAppendOnlyFileException
+
+
+class AppendOnlyFileTest(unittest.TestCase):
+	def setUp(self):
+		descriptor, self.path = tempfile.mkstemp(suffix='.aof')
+		os.close(descriptor)
+		append_only_file = AppendOnlyFile(self.path, AppendOnlyFile.NO)
+		self.offsets = []		# start of every record
+		offset = 0
+		for index in range(101):
+			self.offsets.append(offset)
+			offset += len(AppendOnlyFile.encode_record(AppendOnlyFile.PUT, f'key-{index}', index))
+			append_only_file.append(AppendOnlyFile.PUT, f'key-{index}', index)
+		append_only_file.close()
+
+	def tearDown(self):
+		os.remove(self.path)
+
+	def _corrupt(self, position):
+		with open(self.path, 'r+b') as log:
+			log.seek(position)
+			byte = log.read(1)
+			log.seek(position)
+			log.write(bytes([byte[0] ^ 0xff]))
+
+	def _replay(self):
+		append_only_file = AppendOnlyFile(self.path, AppendOnlyFile.NO)
+		try:
+			storage = {}
+			append_only_file.replay_into(storage)
+			return storage
+		finally:
+			append_only_file.close()
+
+	def test_replays_every_record(self):
+		self.assertEqual(self._replay(), {f'key-{index}': index for index in range(101)})
+
+	def test_torn_last_record_is_cut_off(self):
+		size = os.path.getsize(self.path)
+		with open(self.path, 'r+b') as log:
+			log.truncate(size - 3)
+		storage = self._replay()
+		self.assertEqual(len(storage), 100)
+		self.assertEqual(os.path.getsize(self.path), self.offsets[100])
+
+	def test_corrupted_length_in_the_middle_raises(self):
+		size = os.path.getsize(self.path)
+		self._corrupt(self.offsets[10] + 1)		# key length of record 10
+		with self.assertRaises(CorruptedAppendOnlyFileException):
+			self._replay()
+		self.assertEqual(os.path.getsize(self.path), size)
+
+	def test_corrupted_value_in_the_middle_raises(self):
+		self._corrupt(self.offsets[11] - 1)		# last byte of record 10
+		with self.assertRaises(CorruptedAppendOnlyFileException):
+			self._replay()
+
+
+if __name__ == '__main__':
+	unittest.main()
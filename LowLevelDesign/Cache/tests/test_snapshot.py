@@ -0,0 +1,47 @@
+import os
+import tempfile
+import unittest
+
+from database.exceptions.corrupted_snapshot_exception import CorruptedSnapshotException
+from database.snapshot import load_snapshot, write_snapshot
+
+
+class SnapshotTest(unittest.TestCase):
+	def setUp(self):
+		descriptor, self.path = tempfile.mkstemp(suffix='.snapshot')
+		os.close(descriptor)
+		self.items = {f'key-{index}': index for index in range(100)}
+		self.items[(1, 2)] = {'nested': [1, 2, 3]}
+		write_snapshot(self.path, self.items.items())
+
+	def tearDown(self):
+		os.remove(self.path)
+
+	def _corrupt(self, position):
+		with open(self.path, 'r+b') as snapshot:
+			snapshot.seek(position)
+			byte = snapshot.read(1)
+			snapshot.seek(position)
+			snapshot.write(bytes([byte[0] ^ 0xff]))
+
+	def test_loads_what_was_written(self):
+		self.assertEqual(load_snapshot(self.path), self.items)
+
+	def test_corrupted_entry_raises(self):
+		size = os.path.getsize(self.path)
+		for position in (12, 13, 20, size // 2, size - 30):
+			with self.subTest(position=position):
+				write_snapshot(self.path, self.items.items())
+				self._corrupt(position)
+				with self.assertRaises(CorruptedSnapshotException):
+					load_snapshot(self.path)
+
+	def test_truncated_raises(self):
+		with open(self.path, 'r+b') as snapshot:
+			snapshot.truncate(os.path.getsize(self.path) - 5)
+		with self.assertRaises(CorruptedSnapshotException):
+			load_snapshot(self.path)
+
+
+if __name__ == '__main__':
+	unittest.main()